@@ -0,0 +1,296 @@
+from classes.agent import Agent  # Agents used by the reproduction benchmarks
+from classes.environment import Environment, SparseEnvironment, OutOfBound  # Environments used by the fitness benchmarks
+from classes.evaluator import evaluate_inst_sets  # Evaluation of a large generation
+from classes.evolution import Evolution  # Runner used by the end-to-end benchmark
+from classes.machine import Machine, MaxInstructionsReached  # Virtual machine benchmarked on the genome corpus
+from classes.map_loader import load_map  # Map used by the fitness and end-to-end benchmarks
+from classes.population import Population  # Population used by the reproduction benchmarks
+from classes.scheduler import POLICIES  # Scheduler policies compared by generations to solution
+from classes.trajectory_cache import TrieEnvironment  # Fitness scoring through the trajectory trie
+import argparse  # Command line options
+import json  # Baseline files
+import os  # Default number of worker processes of the solution benchmark
+import platform  # Recorded with the results to compare like with like
+import random  # Fixed-seed genome corpus and reproducible mutations
+import statistics  # Median generations to solution
+import sys  # Exit code of the regression check
+import time  # Timers
+
+SEED = 2024  # Seed of the genome corpus and of every benchmark run
+CORPUS_SIZE = 2000  # Number of genomes in the fixed corpus
+GENOME_LENGTH = 30  # Same instruction set length as setup.py
+MAP_PATH = "resources/input.txt"
+LARGE_GENERATION = 20000  # Agents of the large-generation evaluation benchmarks
+MIN_SAMPLE_SECONDS = 0.2  # Every timing sample repeats a benchmark at least this long (single runs take a few ms)
+
+def make_corpus(size=CORPUS_SIZE, length=GENOME_LENGTH, seed=SEED):
+    # Fixed genome corpus, identical on every machine and every run
+    rng = random.Random(seed)
+    return [[rng.randint(0, 255) for _ in range(length)] for _ in range(size)]
+
+def make_population(corpus):
+    # Population of 201 agents from the corpus with fixed, distinct fitness values
+    rng = random.Random(SEED)
+    population = Population()
+    for inst_set in corpus[:201]:
+        agent = Agent(list(inst_set))
+        agent.fit_index = rng.uniform(-5, 5)
+        population.add_agent(agent)
+    return population
+
+def bench_vm(backend, corpus, game_map):
+    machine = Machine(backend=backend)
+
+    def run():
+        for inst_set in corpus:
+            machine.fill_memory(inst_set)
+            try:
+                machine.execute_commands()
+            except MaxInstructionsReached:
+                pass
+            machine.clear_memory()
+        return len(corpus)
+    return run
+
+def bench_fitness(corpus, game_map, environment_class=Environment):
+    # Trajectories are computed once, only Environment.fitness_function is timed
+    # (a new environment per run, so the trajectory trie starts empty every time)
+    machine = Machine(backend='bytes')
+    trajectories = []
+    for inst_set in corpus:
+        machine.fill_memory(inst_set)
+        try:
+            trajectories.append(machine.execute_commands())
+        except MaxInstructionsReached:
+            pass
+        machine.clear_memory()
+
+    def run():
+        environment = environment_class(*game_map)
+        for cmd_set in trajectories:
+            agent = Agent([])
+            agent.cmd_set = cmd_set
+            try:
+                environment.fitness_function(agent)
+            except OutOfBound:
+                pass
+            environment.clear_environment()
+        return len(trajectories)
+    return run
+
+def bench_mutate(mutation_rate):
+    def factory(corpus, game_map):
+        def run():
+            random.seed(SEED)
+            for inst_set in corpus:
+                Agent(list(inst_set)).mutate(mutation_rate)
+            return len(corpus)
+        return run
+    return factory
+
+def bench_crossover(corpus, game_map):
+    population = make_population(corpus)
+
+    def run():
+        random.seed(SEED)
+        agents = population.generation
+        for i in range(len(agents) - 1):
+            population.crossover(agents[i], agents[i + 1])
+        return len(agents) - 1
+    return run
+
+def bench_new_generation(distaction):
+    def factory(corpus, game_map):
+        population = make_population(corpus)
+        generation = list(population.generation)
+
+        def run():
+            random.seed(SEED)
+            population.generation = list(generation)
+            population.create_new_generation(distaction)
+            return 1
+        return run
+    return factory
+
+def bench_array_generation(distaction):
+    # ArrayPopulation.create_new_generation on the genomes and fitness values of make_population
+    def factory(corpus, game_map):
+        from classes.array_population import ArrayPopulation
+        import numpy as np
+        agents = make_population(corpus).generation
+        population = ArrayPopulation(len(agents), GENOME_LENGTH)
+        population.load(b''.join(bytes(agent.inst_set) for agent in agents), [agent.fit_index for agent in agents],
+                        [0] * len(agents), [0] * len(agents))
+        genomes, fitness = population.genomes, population.fitness
+
+        def run():
+            population.rng = np.random.default_rng(SEED)
+            population.genomes, population.fitness = genomes, fitness
+            population.create_new_generation(distaction)
+            return 1
+        return run
+    return factory
+
+def bench_evaluation(batch):
+    # Machines and fitness walks of a generation of LARGE_GENERATION agents, one machine at a time
+    # or all machines in lockstep in the NumPy BatchMachine
+    def factory(corpus, game_map):
+        genomes = make_corpus(LARGE_GENERATION)
+        machine = Machine(backend='bytes')
+        environment = SparseEnvironment(*game_map)
+        batch_machine = None
+        if batch:
+            from classes.batch_machine import BatchMachine
+            batch_machine = BatchMachine()
+
+        def run():
+            evaluate_inst_sets(machine, environment, game_map.start_location, game_map.treasure_locations, genomes,
+                               stop_at_solution=False, batch_machine=batch_machine)
+            return len(genomes)
+        return run
+    return factory
+
+def bench_generations(generations, population='list'):
+    # End-to-end: a serial Evolution run of 201 agents for a fixed number of generations
+    def factory(corpus, game_map):
+        def run():
+            evolution = Evolution(game_map, generations=generations, seed=SEED, workers=1, cache_capacity=0,
+                                  population=population)
+            return evolution.run().generation + 1
+        return run
+    return factory
+
+# Benchmark name -> (factory(corpus, game_map) returning a timed callable, unit of the returned count)
+BENCHMARKS = {
+    'machine.execute_commands[string]': (lambda corpus, game_map: bench_vm('string', corpus, game_map), 'genomes'),
+    'machine.execute_commands[bytes]': (lambda corpus, game_map: bench_vm('bytes', corpus, game_map), 'genomes'),
+    'environment.fitness_function': (bench_fitness, 'trajectories'),
+    'environment.fitness_function[trie]': (lambda corpus, game_map: bench_fitness(corpus, game_map, TrieEnvironment), 'trajectories'),
+    'agent.mutate[0.1]': (bench_mutate(0.1), 'agents'),
+    'agent.mutate[0.7]': (bench_mutate(0.7), 'agents'),
+    'population.crossover': (bench_crossover, 'pairs'),
+    'population.create_new_generation[normal]': (bench_new_generation(False), 'generations'),
+    'population.create_new_generation[distraction]': (bench_new_generation(True), 'generations'),
+    'array_population.create_new_generation[normal]': (bench_array_generation(False), 'generations'),
+    'array_population.create_new_generation[distraction]': (bench_array_generation(True), 'generations'),
+    f'evaluation[bytes, {LARGE_GENERATION} agents]': (bench_evaluation(False), 'agents'),
+    f'evaluation[batch, {LARGE_GENERATION} agents]': (bench_evaluation(True), 'agents'),
+    'evolution[50 generations]': (bench_generations(50), 'generations'),
+    'evolution[50 generations, array population]': (bench_generations(50, 'array'), 'generations'),
+}
+
+def time_sample(run, min_seconds=MIN_SAMPLE_SECONDS):
+    # Call run() until at least min_seconds passed, returns (seconds per call, operations per call)
+    loops = ops = 0
+    start = time.perf_counter()
+    while True:
+        ops += run()
+        loops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / loops, ops / loops
+
+def run_benchmarks(names=None, repeat=5, min_seconds=MIN_SAMPLE_SECONDS):
+    # Take 'repeat' samples of every benchmark (each at least min_seconds long) and keep the fastest one
+    corpus = make_corpus()
+    game_map = load_map(MAP_PATH)
+    results = {}
+    for name, (factory, unit) in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        run = factory(corpus, game_map)
+        best = None
+        for _ in range(repeat):
+            seconds, ops = time_sample(run, min_seconds)
+            if best is None or seconds < best:
+                best = seconds
+        results[name] = {'seconds': best, 'ops': ops, 'unit': unit, 'ops_per_sec': ops / best if best else float('inf')}
+    return results
+
+def generations_to_solution(policy, seed, generations):
+    # Generation at which a serial run with the given scheduler policy found all treasures (None if it did not)
+    evolution = Evolution(load_map(MAP_PATH), generations=generations, seed=seed, workers=1, policy=POLICIES[policy]())
+    result = evolution.run()
+    return result.generation if result.solved else None
+
+def run_solution_benchmark(policies, num_seeds, generations, workers):
+    # Median generations to solution of every policy over the seeds SEED..SEED+num_seeds-1
+    # (unsolved runs count as 'generations', the runs are independent and executed on a process pool)
+    from concurrent.futures import ProcessPoolExecutor
+    seeds = range(SEED, SEED + num_seeds)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for policy in policies:
+            outcomes = list(pool.map(generations_to_solution, [policy] * num_seeds, seeds, [generations] * num_seeds))
+            solved = [outcome for outcome in outcomes if outcome is not None]
+            results[policy] = {'median_generations': statistics.median(generations if outcome is None else outcome
+                                                                        for outcome in outcomes),
+                               'solved': len(solved), 'runs': num_seeds, 'generations': outcomes}
+    return results
+
+def compare(results, baseline, tolerance):
+    # Print the speed ratio against the baseline, returns the names of regressed benchmarks
+    regressions = []
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            print(f"{name:48} {result['ops_per_sec']:14.1f} {result['unit']}/s   (not in baseline)")
+            continue
+        ratio = result['ops_per_sec'] / previous['ops_per_sec']
+        flag = ''
+        if ratio < 1 - tolerance:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:48} {result['ops_per_sec']:14.1f} {result['unit']}/s   x{ratio:.2f} vs baseline{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the VM, fitness function, reproduction and generation loop")
+    parser.add_argument('--only', nargs='*', help="Run only benchmarks whose name contains one of these strings")
+    parser.add_argument('--repeat', type=int, default=5, help="Samples per benchmark, the fastest one is reported")
+    parser.add_argument('--min-time', type=float, default=MIN_SAMPLE_SECONDS, metavar='SECONDS',
+                        help="Minimum duration of every sample (the benchmark is repeated within the sample)")
+    parser.add_argument('--save', metavar='PATH', help="Save the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="Compare the results against a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown before a regression is reported")
+    parser.add_argument('--solutions', type=int, metavar='SEEDS',
+                        help="Instead of the timings, report the median generations to solution over SEEDS seeds")
+    parser.add_argument('--policies', nargs='+', choices=sorted(POLICIES), default=['fixed', 'adaptive'],
+                        help="Scheduler policies compared by --solutions")
+    parser.add_argument('--solution-generations', type=int, default=2000, help="Generation limit of the --solutions runs")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes for --solutions")
+    args = parser.parse_args(argv)
+
+    if args.solutions:
+        solutions = run_solution_benchmark(args.policies, args.solutions, args.solution_generations, args.workers)
+        for policy, result in solutions.items():
+            print(f"{policy:12} median generations to solution {result['median_generations']:8.1f}   "
+                  f"solved {result['solved']}/{result['runs']}")
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump({'python': platform.python_version(), 'seed': SEED, 'solutions': solutions}, file, indent=2)
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        if 'results' not in baseline:
+            parser.error(f"{args.compare} has no timing results (a --solutions file cannot be a baseline)")
+
+    results = run_benchmarks(args.only, args.repeat, args.min_time)
+    regressions = []
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+    else:
+        for name, result in results.items():
+            print(f"{name:48} {result['ops_per_sec']:14.1f} {result['unit']}/s   ({result['seconds']:.4f}s)")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'seed': SEED, 'results': results}, file, indent=2)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import numpy as np  # NumPy arrays hold the genomes and the evaluation results of the whole population
+from classes.selection import Ranking  # Base ranking shared with the list-based Population
+
+class AgentView:
+    # Lightweight view of one row of an ArrayPopulation, exposes the same attributes as Agent
+    __slots__ = ('population', 'index')
+
+    def __init__(self, population, index):
+        self.population = population  # Population owning the arrays
+        self.index = index  # Row of this agent in the arrays
+
+    @property
+    def inst_set(self):
+        return self.population.genomes[self.index]  # Row view of the uint8 genome matrix
+
+    @property
+    def fit_index(self):
+        return float(self.population.fitness[self.index])
+
+    @fit_index.setter
+    def fit_index(self, value):
+        self.population.fitness[self.index] = value
+
+    @property
+    def steps(self):
+        return int(self.population.steps[self.index])
+
+    @steps.setter
+    def steps(self, value):
+        self.population.steps[self.index] = value
+
+    @property
+    def treasures_found(self):
+        return int(self.population.treasures[self.index])
+
+    @treasures_found.setter
+    def treasures_found(self, value):
+        self.population.treasures[self.index] = value
+
+    @property
+    def cmd_set(self):
+        return self.population.cmd_sets[self.index]
+
+    @cmd_set.setter
+    def cmd_set(self, value):
+        self.population.cmd_sets[self.index] = value
+
+class ArrayRanking(Ranking):
+    # Ranking over a NumPy fitness array, selections are done with argmax/argpartition
+
+    def __init__(self, fitness, rng):
+        super().__init__(fitness)
+        self.rng = rng  # Generator used to draw tournament contestants
+
+    def best(self):
+        if self._best is None:
+            self._best = int(np.argmax(self.fitness))  # First agent with the highest fitness
+        return self._best
+
+    def top(self, k):
+        # Indices of the k best agents in descending fitness order (ties keep the lower index first)
+        if k not in self._top:
+            count = max(0, min(k, self.size))
+            if count == 0:
+                candidates = np.arange(0)
+            elif count < self.size:
+                candidates = np.argpartition(-self.fitness, count - 1)[:count]
+            else:
+                candidates = np.arange(self.size)
+            order = np.lexsort((candidates, -self.fitness[candidates]))
+            self._top[k] = candidates[order]
+        return self._top[k]
+
+    def draw_contestants(self, count, size):
+        # (count x size) index array, contestants are drawn with replacement
+        return self.rng.integers(0, self.size, size=(count, size))
+
+    def tournaments(self, contestants):
+        # Winner of every row of contestants, on equal fitness the later contestant wins
+        reversed_fitness = self.fitness[contestants[:, ::-1]]
+        position = contestants.shape[1] - 1 - np.argmax(reversed_fitness, axis=1)
+        return contestants[np.arange(contestants.shape[0]), position]
+
+class ArrayPopulation:
+    def __init__(self, num_agents, num_instructions, seed=None, block_size=65536, num_elite=1, tournament_size=2,
+                 crossover_rate=0.1, crossover_identical_rate=0.5, random_crossover_rate=0.7,
+                 random_crossover_identical_rate=0.9):
+        # All genomes live in one contiguous (num_agents x num_instructions) uint8 matrix
+        self.rng = np.random.default_rng(seed)  # Seeded generator driving every random decision
+        self.num_agents = num_agents  # Number of agents in every generation
+        self.num_instructions = num_instructions  # Instruction set length
+        self.block_size = block_size  # Number of rows mutated at once (bounds the temporary arrays)
+        self.num_elite = num_elite  # Number of elite agents carried over unchanged
+        self.tournament_size = tournament_size  # Number of contestants in every parent tournament
+        # Mutation rates of the children, like in Population (a separate rate is used when both parents are the same agent)
+        self.crossover_rate = crossover_rate
+        self.crossover_identical_rate = crossover_identical_rate
+        self.random_crossover_rate = random_crossover_rate
+        self.random_crossover_identical_rate = random_crossover_identical_rate
+        self.genomes = self.rng.integers(0, 256, size=(num_agents, num_instructions), dtype=np.uint8)
+        self.reset_results()
+        self.generation = [AgentView(self, i) for i in range(num_agents)]  # Views are created only once
+        self.fitness_history = []  # To track fitness progression across generations
+        self.first_i = 0  # Best fitness of the last generation (same role as in Population)
+
+    def __getitem__(self, index):
+        return self.generation[index]
+
+    def __len__(self):
+        return self.num_agents
+
+    def load(self, genomes, fitness, steps, treasures):
+        # Replace the population by saved genomes (bytes, one row after the other) and their evaluation results
+        self.genomes = np.frombuffer(genomes, dtype=np.uint8).reshape(len(fitness), -1).copy()
+        self.num_agents, self.num_instructions = self.genomes.shape
+        self.reset_results()
+        self.fitness[:] = fitness
+        self.steps[:] = steps
+        self.treasures[:] = treasures
+        self.generation = [AgentView(self, i) for i in range(self.num_agents)]
+
+    def reset_results(self):
+        # Fresh evaluation results, like newly created Agent objects
+        self.fitness = np.zeros(self.num_agents, dtype=np.float64)
+        self.steps = np.zeros(self.num_agents, dtype=np.int64)
+        self.treasures = np.zeros(self.num_agents, dtype=np.int64)
+        self.cmd_sets = [[]] * self.num_agents  # Shared empty list, the evaluator always assigns a new one
+
+    def rank(self):
+        # Rank the current generation once, the ranking can be passed on to create_new_generation
+        return ArrayRanking(self.fitness, self.rng)
+
+    def create_new_generation(self, distaction, ranking=None):
+        if ranking is None:
+            ranking = self.rank()
+        # Elitism: the best agents are carried over unchanged
+        elite = ranking.top(self.num_elite)
+        num_pairs = -(-(self.num_agents - len(elite)) // 2)  # Enough pairs to refill the whole population
+
+        if not distaction:
+            # Two tournaments between random agents select the parents
+            size = self.tournament_size
+            contestants = ranking.draw_contestants(num_pairs, 2 * size)
+            parent1 = ranking.tournaments(contestants[:, :size])
+            parent2 = ranking.tournaments(contestants[:, size:])
+            child1, child2, rates = self.crossover(parent1, parent2)
+        else:
+            # Random parent and the best of three random agents, combined by the random crossover
+            parent1 = self.rng.integers(0, self.num_agents, size=num_pairs)
+            parent2 = ranking.tournaments(ranking.draw_contestants(num_pairs, 3))
+            child1, child2, rates = self.random_crossover(parent1, parent2)
+
+        # Children are interleaved (child1, child2 of every pair) like in Population
+        children = np.empty((2 * num_pairs, self.num_instructions), dtype=np.uint8)
+        children[0::2] = child1
+        children[1::2] = child2
+        child_rates = np.repeat(rates, 2)
+        self.mutate(children, child_rates)
+
+        new_genomes = np.empty_like(self.genomes)
+        new_genomes[:len(elite)] = self.genomes[elite]
+        new_genomes[len(elite):] = children[:self.num_agents - len(elite)]
+        self.genomes = new_genomes
+        self.reset_results()
+
+    def crossover(self, parent1, parent2):
+        # Batched Population.crossover: the better-fit parent starts both children
+        length = self.num_instructions
+        parse_point = self.rng.integers(0, length + 1, size=parent1.shape[0])[:, None]
+        better = np.where(self.fitness[parent1] > self.fitness[parent2], parent1, parent2)
+        worse = np.where(better == parent1, parent2, parent1)
+        columns = np.arange(length)[None, :]
+        head = columns < parse_point
+
+        first = self.genomes[better]
+        second = self.genomes[worse]
+        # child1: better[:p] + worse[:length - p], child2: better[:p] + worse[p:]
+        shifted = np.take_along_axis(second, np.where(head, 0, columns - parse_point), axis=1)
+        child1 = np.where(head, first, shifted)
+        child2 = np.where(head, first, second)
+
+        # Higher mutation if both parents are the same agent
+        rates = np.where(parent1 == parent2, self.crossover_identical_rate, self.crossover_rate)
+        return child1, child2, rates
+
+    def random_crossover(self, parent1, parent2):
+        # Batched Population.random_crossover: child1 = parent1[p:] + parent2[:p], child2 = parent2[p:] + parent1[:p]
+        length = self.num_instructions
+        parse_point = self.rng.integers(0, length + 1, size=parent1.shape[0])[:, None]
+        columns = np.arange(length)[None, :]
+        source = (columns + parse_point) % length  # Rotated column of every gene
+        tail = columns < length - parse_point  # Genes taken from the first listed parent
+
+        genes1 = np.take_along_axis(self.genomes[parent1], source, axis=1)
+        genes2 = np.take_along_axis(self.genomes[parent2], source, axis=1)
+        child1 = np.where(tail, genes1, genes2)
+        child2 = np.where(tail, genes2, genes1)
+
+        rates = np.where(parent1 == parent2, self.random_crossover_identical_rate, self.random_crossover_rate)
+        return child1, child2, rates
+
+    def mutate(self, genomes, rates):
+        # Batched Agent.mutate (in place): 0-4 rounds for low rates, 3-9 rounds for high rates,
+        # in every round each gene mutates with the row's rate by swap, increment or decrement
+        for start in range(0, genomes.shape[0], self.block_size):
+            self.mutate_block(genomes[start:start + self.block_size], rates[start:start + self.block_size])
+
+    def mutate_block(self, genomes, rates):
+        num_rows, length = genomes.shape
+        high = rates >= 0.5
+        repeat = np.where(high, self.rng.integers(3, 10, size=num_rows), self.rng.integers(0, 5, size=num_rows))
+        row_ids = np.arange(num_rows)
+
+        for round_number in range(int(repeat.max(initial=0))):
+            rows = row_ids[repeat > round_number]  # Rows that still have mutation rounds left
+            block = genomes[rows]
+            hit = self.rng.random(block.shape, dtype=np.float32) < rates[rows, None]
+            kind = self.rng.integers(0, 3, size=block.shape, dtype=np.uint8)
+
+            # Increment / decrement wrap around 256 through uint8 arithmetic
+            block += (hit & (kind == 1)).astype(np.uint8)
+            block -= (hit & (kind == 2)).astype(np.uint8)
+
+            # Swaps: every row performs as many random swaps as it drew, one swap per row at a time
+            if length > 1:
+                swaps = (hit & (kind == 0)).sum(axis=1)
+                for swap_number in range(int(swaps.max(initial=0))):
+                    swap_rows = np.flatnonzero(swaps > swap_number)
+                    idx1 = self.rng.integers(0, length, size=swap_rows.size)
+                    idx2 = (idx1 + self.rng.integers(1, length, size=swap_rows.size)) % length  # Distinct index
+                    values1 = block[swap_rows, idx1]
+                    block[swap_rows, idx1] = block[swap_rows, idx2]
+                    block[swap_rows, idx2] = values1
+            genomes[rows] = block
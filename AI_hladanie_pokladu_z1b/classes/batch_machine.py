@@ -0,0 +1,99 @@
+import numpy as np  # NumPy is used to step all virtual machines of a generation at once
+from classes.machine import Machine, MOVES  # Reuse the machine limits and the precomputed movement table
+
+# Movement table as ASCII codes, so outputs can be stored in a uint8 buffer
+MOVE_CODES = np.array([ord(move) for move in MOVES], dtype=np.uint8)
+
+class BatchMachine:
+    ARCHITECTURE = Machine.ARCHITECTURE  # 64 memory addresses per machine
+    MAX_INSTRUCTIONS = Machine.MAX_INSTRUCTIONS  # Instruction cap shared with the single machine
+
+    def __init__(self, initial_output_width=64):
+        # Initial number of output slots per machine, the buffer doubles whenever a machine fills it
+        self.initial_output_width = initial_output_width
+
+    def fill_memory(self, inst_sets):
+        # Build an (N x 64) uint8 memory matrix from the agents' instruction sets
+        # Like Machine.fill_memory, only the first 64 values are used and the rest of the memory stays 0
+        lengths = {len(inst_set) for inst_set in inst_sets}
+        if len(lengths) == 1 and lengths.pop() <= self.ARCHITECTURE:
+            # Genomes of one length (a generation) are joined into the matrix in a single copy
+            rows = np.frombuffer(b''.join(bytes(inst_set) for inst_set in inst_sets), dtype=np.uint8)
+            memory = np.zeros((len(inst_sets), self.ARCHITECTURE), dtype=np.uint8)
+            memory[:, :rows.size // len(inst_sets)] = rows.reshape(len(inst_sets), -1)
+            return memory
+        memory = np.zeros((len(inst_sets), self.ARCHITECTURE), dtype=np.uint8)
+        for row, inst_set in enumerate(inst_sets):
+            values = [0 if value is None else value for value in inst_set[:self.ARCHITECTURE]]
+            memory[row, :len(values)] = values
+        return memory
+
+    def execute_commands(self, memory):
+        # Executes all machines of the memory matrix in lockstep (the matrix is modified in place)
+        # Returns the trajectories (lists of 'H', 'D', 'P', 'L'), a boolean array marking the machines that hit
+        # the instruction cap (their trajectory is left empty) and the number of instructions every machine executed
+        # There is no cycle detection: an endless loop runs until the cap, like Machine(detect_cycles=False)
+        num_machines = memory.shape[0]
+        pc = np.zeros(num_machines, dtype=np.int64)  # Program counter of every machine
+        instructions = np.full(num_machines, self.MAX_INSTRUCTIONS, dtype=np.int64)  # Executed instructions
+        out_len = np.zeros(num_machines, dtype=np.int64)  # Number of outputs written by every machine
+        outputs = np.zeros((num_machines, self.initial_output_width), dtype=np.uint8)  # Output buffer
+        active = np.arange(num_machines)  # Indices of machines that are still running
+
+        for step in range(self.MAX_INSTRUCTIONS):
+            if active.size == 0:
+                break
+
+            current_cmd = memory[active, pc[active]]  # Fetch the current command of every active machine
+            cmd = current_cmd >> 6  # First 2 bits: command type
+            address = (current_cmd & 0b111111).astype(np.int64)  # Last 6 bits: memory address
+
+            # Command 0: increment (uint8 arithmetic wraps around at 255)
+            mask = cmd == 0
+            if mask.any():
+                memory[active[mask], address[mask]] += 1
+
+            # Command 1: decrement (uint8 arithmetic wraps around at 0)
+            mask = cmd == 1
+            if mask.any():
+                memory[active[mask], address[mask]] -= 1
+
+            # Command 3: output a movement
+            mask = cmd == 3
+            if mask.any():
+                rows = active[mask]
+                slots = out_len[rows]
+                if slots.max() >= outputs.shape[1]:
+                    # Double the output buffer when some machine runs out of slots
+                    outputs = np.concatenate((outputs, np.zeros_like(outputs)), axis=1)
+                outputs[rows, slots] = MOVE_CODES[current_cmd[mask]]
+                out_len[rows] = slots + 1
+
+            # Command 2: jump to the address, every other command moves to the next address
+            jump = cmd == 2
+            pc[active] = np.where(jump, address, pc[active] + 1)
+
+            # Machines that ran past the end of memory have halted and leave the active mask
+            running = pc[active] < self.ARCHITECTURE
+            if not running.all():
+                instructions[active[~running]] = step + 1
+                active = active[running]
+
+        # Machines still active after MAX_INSTRUCTIONS steps have reached the instruction cap
+        capped = np.zeros(num_machines, dtype=bool)
+        capped[active] = True
+        out_len[active] = 0
+
+        trajectories = [list(outputs[row, :out_len[row]].tobytes().decode('ascii')) for row in range(num_machines)]
+        return trajectories, capped, instructions
+
+    def run(self, inst_sets):
+        # Convenience method: fill a fresh memory matrix and execute it
+        return self.execute_commands(self.fill_memory(inst_sets))
+
+    def run_programs(self, inst_sets):
+        # (trajectory, instructions) of every instruction set, like classes/evaluator.py run_program
+        # (the trajectory is None for a machine that hit the instruction cap)
+        trajectories, capped, instructions = self.run(inst_sets)
+        return [(None if stopped else trajectory, count)
+                for trajectory, stopped, count in zip(trajectories, capped.tolist(), instructions.tolist())]
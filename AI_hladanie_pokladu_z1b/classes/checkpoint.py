@@ -0,0 +1,138 @@
+import json  # Metadata (counters, fitness history, random generator state)
+import mmap  # Memory-mapped access to the genome matrix
+import os  # Atomic file replacement and directory listing
+import queue  # Hand-over of snapshots to the writer thread
+import struct  # Fixed-size binary header
+import sys  # Byte order of the fitness arrays
+import threading  # Checkpoints are written in the background
+from array import array  # Compact fitness / steps / treasures arrays
+
+# Checkpoint file layout (little endian):
+#   header   : magic, version, number of agents, genome length, generation, metadata length
+#   genomes  : num_agents * genome_length raw uint8 values (row per agent), starts at HEADER_SIZE so it can be memory-mapped
+#   fitness  : num_agents float64
+#   steps    : num_agents int64
+#   treasures: num_agents int64
+#   metadata : UTF-8 JSON
+MAGIC = b'TSCP'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxIIQQ')
+HEADER_SIZE = HEADER.size
+FILE_PATTERN = "checkpoint_{:06d}.tsc"
+
+class CheckpointError(Exception):
+    pass
+
+def _to_bytes(values, typecode):
+    # Little-endian bytes of a numeric array
+    values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+def _from_bytes(data, typecode):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tolist()
+
+def save_checkpoint(path, state):
+    # Write a checkpoint atomically (temporary file + rename), 'state' is a dict with:
+    # generation, num_agents, genome_length, genomes (bytes), fitness, steps, treasures (lists) and meta (JSON-able dict)
+    num_agents, genome_length = state['num_agents'], state['genome_length']
+    if len(state['genomes']) != num_agents * genome_length:
+        raise CheckpointError("Genome matrix does not match num_agents x genome_length")
+    meta = json.dumps(state['meta']).encode('utf-8')
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, num_agents, genome_length, state['generation'], len(meta)))
+        file.write(state['genomes'])
+        file.write(_to_bytes(state['fitness'], 'd'))
+        file.write(_to_bytes(state['steps'], 'q'))
+        file.write(_to_bytes(state['treasures'], 'q'))
+        file.write(meta)
+    os.replace(temporary, path)
+
+def read_header(file):
+    magic, version, num_agents, genome_length, generation, meta_length = HEADER.unpack(file.read(HEADER_SIZE))
+    if magic != MAGIC:
+        raise CheckpointError("Not a checkpoint file")
+    if version != VERSION:
+        raise CheckpointError(f"Unsupported checkpoint version {version}")
+    return num_agents, genome_length, generation, meta_length
+
+def load_checkpoint(path):
+    # Read a whole checkpoint back into the dict written by save_checkpoint
+    with open(path, "rb") as file:
+        num_agents, genome_length, generation, meta_length = read_header(file)
+        genomes = file.read(num_agents * genome_length)
+        fitness = _from_bytes(file.read(8 * num_agents), 'd')
+        steps = _from_bytes(file.read(8 * num_agents), 'q')
+        treasures = _from_bytes(file.read(8 * num_agents), 'q')
+        meta = json.loads(file.read(meta_length).decode('utf-8'))
+    return {'generation': generation, 'num_agents': num_agents, 'genome_length': genome_length, 'genomes': genomes,
+            'fitness': fitness, 'steps': steps, 'treasures': treasures, 'meta': meta}
+
+def map_genomes(path):
+    # Memory-map the genome matrix of a checkpoint without reading the file
+    # Returns (mmap, flat memoryview of the genomes, (num_agents, genome_length)), genome i is
+    # view[i * genome_length:(i + 1) * genome_length] (NumPy users can wrap the view with numpy.frombuffer)
+    # Release the view and close the mmap when done
+    with open(path, "rb") as file:
+        num_agents, genome_length, _, _ = read_header(file)
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)[HEADER_SIZE:HEADER_SIZE + num_agents * genome_length]
+    return mapped, view, (num_agents, genome_length)
+
+def list_checkpoints(directory):
+    # Checkpoint files of a directory, oldest generation first
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.startswith("checkpoint_") and name.endswith(".tsc"))
+    return [os.path.join(directory, name) for name in names]
+
+def latest_checkpoint(directory):
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+class CheckpointWriter:
+    # Writes checkpoints in a background thread so the generation loop never waits for the disk
+
+    def __init__(self, directory, keep=None):
+        self.directory = directory
+        self.keep = keep  # Number of newest checkpoints kept (None keeps all)
+        self.queue = queue.Queue()
+        self.error = None  # First error raised by the writer thread
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def path_for(self, generation):
+        return os.path.join(self.directory, FILE_PATTERN.format(generation))
+
+    def save(self, state):
+        # Queue a snapshot (the snapshot must not share mutable data with the running population)
+        if self.error is not None:
+            raise self.error
+        self.queue.put(state)
+
+    def write_loop(self):
+        while True:
+            state = self.queue.get()
+            if state is None:
+                break
+            try:
+                save_checkpoint(self.path_for(state['generation']), state)
+                if self.keep:
+                    for path in list_checkpoints(self.directory)[:-self.keep]:
+                        os.remove(path)
+            except Exception as error:
+                self.error = error
+
+    def close(self):
+        # Wait until every queued checkpoint is written
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
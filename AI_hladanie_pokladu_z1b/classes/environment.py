@@ -1,3 +1,4 @@
+import hashlib  # Compact map fingerprint
 from classes.machine import MaxInstructionsReached  # Import custom exception to handle instruction overflow
 
 # Custom exception for when the agent moves out of the defined boundaries
@@ -11,7 +12,16 @@ class Environment:
         self.x = start_location[0]  # Agent's current x-coordinate
         self.y = start_location[1]  # Agent's current y-coordinate
         self.num_treasures = len(treasure_locations)  # Total number of treasures in the environment
+        self.start_location = tuple(start_location)  # Kept to reset the environment without arguments
+        self.treasure_locations = tuple(tuple(treasure) for treasure in treasure_locations)
         self.base = self.initialize_environment(treasure_locations)  # Set up the environment grid
+        # Compact identifier of the map (e.g. in the fitness cache), hashed once instead of on every cache lookup
+        map_key = (size, tuple(start_location), tuple(sorted(tuple(treasure) for treasure in treasure_locations)))
+        self.map_digest = hashlib.blake2b(repr(map_key).encode('ascii'), digest_size=16).digest()
+
+    def fingerprint(self):
+        # Digest of the map (size, start location and treasure locations)
+        return self.map_digest
 
     def initialize_environment(self, treasure_locations):
         # Create an empty grid and place treasures at specified locations
@@ -20,8 +30,12 @@ class Environment:
             base[treasure[1]][treasure[0]] = 1  # Mark treasure locations with a '1'
         return base
 
-    def clear_environment(self, start_location, treasure_locations):
+    def clear_environment(self, start_location=None, treasure_locations=None):
         # Reset the environment to its initial state (used after each agent evaluation)
+        if start_location is None:
+            start_location = self.start_location
+        if treasure_locations is None:
+            treasure_locations = self.treasure_locations
         self.x = start_location[0]  # Reset agent's x-coordinate
         self.y = start_location[1]  # Reset agent's y-coordinate
         self.num_treasures = len(treasure_locations)  # Reset the number of treasures
@@ -35,7 +49,7 @@ class Environment:
                 return True  # Return True when treasure is found
             return False  # No treasure at the current location
         else:
-            OutOfBound(agent)  # Raise OutOfBound exception if agent goes out of bounds
+            raise OutOfBound(agent)  # Raise OutOfBound exception if agent goes out of bounds
 
     def fitness_function(self, agent):
         # Fitness function to evaluate the agent's performance (steps taken and treasures found)
@@ -87,3 +101,40 @@ class Environment:
         
         # Calculate the agent's fitness and return whether all treasures are found
         return self.fitness_function(agent)
+
+class SparseEnvironment(Environment):
+    # Environment for large maps: treasures are kept in a sparse index instead of a size x size grid,
+    # collected treasures are marked in a mask that is reset in time proportional to the treasures collected
+
+    def initialize_environment(self, treasure_locations):
+        # Map every treasure location to its position in the collected mask
+        self.treasure_index = {}
+        for treasure in treasure_locations:
+            self.treasure_index.setdefault(tuple(treasure), len(self.treasure_index))
+        self.collected = bytearray(len(self.treasure_index))  # 1 for every treasure already picked up
+        self.collected_indices = []  # Treasures picked up by the current agent
+        return None  # No grid is allocated
+
+    def clear_environment(self, start_location=None, treasure_locations=None):
+        # Reset the position and un-collect only the treasures the last agent picked up
+        # (the map itself is immutable, treasure_locations is accepted for compatibility)
+        if start_location is None:
+            start_location = self.start_location
+        self.x = start_location[0]
+        self.y = start_location[1]
+        collected = self.collected
+        for index in self.collected_indices:
+            collected[index] = 0
+        self.collected_indices.clear()
+
+    def check_coordinates(self, agent):
+        # Same result as Environment.check_coordinates, using the sparse treasure index
+        if 0 <= self.x < self.size and 0 <= self.y < self.size:
+            index = self.treasure_index.get((self.x, self.y))
+            if index is not None and not self.collected[index]:
+                self.collected[index] = 1  # Remove the treasure from the map
+                self.collected_indices.append(index)
+                return True
+            return False
+        else:
+            raise OutOfBound(agent)
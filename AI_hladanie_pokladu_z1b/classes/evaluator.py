@@ -0,0 +1,223 @@
+import os  # Used to pick a default number of worker processes
+from classes.agent import Agent  # Agents are rebuilt inside the workers from their instruction sets
+from classes.environment import Environment, SparseEnvironment, OutOfBound  # Environments used for the fitness walk
+from classes.machine import Machine, MaxInstructionsReached  # Virtual machine interpreting the instruction sets
+
+# Smallest number of agents sent to a worker process at once, a smaller chunk costs more in the process round
+# trip than its evaluation (one agent takes ~14 us, one chunk round trip with its results ~0.5 ms)
+MIN_CHUNK_SIZE = 128
+
+# Cycle detection counters of the machines, collected from the worker processes
+MACHINE_COUNTERS = ('cycles_detected', 'steps_saved')
+
+# Penalties recorded in the result tuples (named like the counters of classes/instrumentation.py)
+MAX_INSTRUCTIONS = 'max_instructions_reached'
+OUT_OF_BOUND = 'out_of_bound'
+
+def run_program(machine, inst_set):
+    # Execute an instruction set, returns (trajectory, executed instructions)
+    # The trajectory is None when the machine stopped at the instruction limit (or found an endless loop)
+    machine.fill_memory(inst_set)  # Load the instruction set into the machine's memory
+    try:
+        trajectory = machine.execute_commands()
+    except MaxInstructionsReached:
+        trajectory = None
+    machine.clear_memory()
+    return trajectory, machine.instructions
+
+def score_trajectory(environment, agent, trajectory, start_location, treasure_locations):
+    # Fitness walk of an executed agent (trajectory from run_program), then reset the environment
+    # Returns (True if the agent found all treasures, penalty applied: None, MAX_INSTRUCTIONS or OUT_OF_BOUND)
+    found = False
+    penalty = None
+    if trajectory is None:
+        agent.fit_index = -1  # The machine exceeded the allowed instruction limit
+        penalty = MAX_INSTRUCTIONS
+    else:
+        agent.cmd_set = trajectory
+        try:
+            found = environment.fitness_function(agent)
+        except OutOfBound:
+            # Handle case where agent moves out of bounds, assigning negative fitness
+            agent.fit_index = (agent.treasures_found + 0.1 - (agent.steps / 100)) * -1
+            penalty = OUT_OF_BOUND
+    environment.clear_environment(start_location, treasure_locations)
+    return found, penalty
+
+def evaluate_agent(machine, environment, agent, start_location, treasure_locations):
+    # Evaluate a single agent and reset the machine and environment for the next one
+    # Returns (True if the agent found all treasures, penalty applied: None, MAX_INSTRUCTIONS or OUT_OF_BOUND)
+    trajectory, _ = run_program(machine, agent.inst_set)
+    return score_trajectory(environment, agent, trajectory, start_location, treasure_locations)
+
+# Per-process state of a worker (each worker owns its own Machine and Environment)
+_worker_state = {}
+
+def make_environment(size, start_location, treasure_locations, sparse=False, trajectory_nodes=0):
+    # Grid environment, sparse environment, or sparse environment scoring through a trajectory trie
+    if trajectory_nodes:
+        from classes.trajectory_cache import TrieEnvironment
+        return TrieEnvironment(size, start_location, treasure_locations, trajectory_nodes)
+    return (SparseEnvironment if sparse else Environment)(size, start_location, treasure_locations)
+
+def make_batch_machine(batch_size):
+    # BatchMachine for batch_size > 0 (NumPy is only imported then), otherwise None
+    if not batch_size:
+        return None
+    from classes.batch_machine import BatchMachine
+    return BatchMachine()
+
+def _init_worker(size, start_location, treasure_locations, backend, sparse, trajectory_nodes, batch_size):
+    # Called once in every worker process of the pool
+    _worker_state['machine'] = Machine(backend=backend)
+    _worker_state['batch_machine'] = make_batch_machine(batch_size)
+    _worker_state['batch_size'] = batch_size
+    _worker_state['environment'] = make_environment(size, start_location, treasure_locations, sparse, trajectory_nodes)
+    _worker_state['start_location'] = start_location
+    _worker_state['treasure_locations'] = treasure_locations
+
+def evaluate_inst_sets(machine, environment, start_location, treasure_locations, inst_sets, stop_at_solution=True,
+                       batch_machine=None):
+    # Evaluate instruction sets in order with the given machine and environment
+    # Returns a list of (fit_index, steps, treasures_found, cmd_set, found, penalty, vm_steps) tuples, by default
+    # the list is cut after the first agent that finds all treasures (later agents would never be evaluated serially)
+    # With a batch_machine all programs run at once in lockstep (no cycle detection, an endless loop counts 500
+    # instructions), the fitness walks follow in order
+    runs = batch_machine.run_programs(inst_sets) if batch_machine is not None else None
+    results = []
+    for index, inst_set in enumerate(inst_sets):
+        agent = Agent(list(inst_set))
+        if runs is None:
+            found, penalty = evaluate_agent(machine, environment, agent, start_location, treasure_locations)
+            instructions = machine.instructions
+        else:
+            trajectory, instructions = runs[index]
+            found, penalty = score_trajectory(environment, agent, trajectory, start_location, treasure_locations)
+        results.append((agent.fit_index, agent.steps, agent.treasures_found, agent.cmd_set, found, penalty,
+                        instructions))
+        if found and stop_at_solution:
+            break
+    return results
+
+def _evaluate_chunk(inst_sets):
+    # Evaluate a chunk of instruction sets inside a worker process
+    # Returns (result tuples, increase of the MACHINE_COUNTERS of the worker machine)
+    machine = _worker_state['machine']
+    before = [getattr(machine, name) for name in MACHINE_COUNTERS]
+    batch_machine = _worker_state['batch_machine'] if len(inst_sets) >= _worker_state['batch_size'] else None
+    results = evaluate_inst_sets(machine, _worker_state['environment'], _worker_state['start_location'],
+                                 _worker_state['treasure_locations'], inst_sets, batch_machine=batch_machine)
+    return results, [getattr(machine, name) - value for name, value in zip(MACHINE_COUNTERS, before)]
+
+class ParallelEvaluator:
+    def __init__(self, size, start_location, treasure_locations, workers=None, chunk_size=None, backend='bytes', cache=None, sparse=False,
+                 trajectory_nodes=0, batch_size=0):
+        # workers=None uses every available core, workers=1 evaluates serially in this process
+        # With batch_size, the machines of a generation (or of a worker chunk) of at least batch_size agents run
+        # in a NumPy BatchMachine (classes/batch_machine.py), it pays off from several thousand agents
+        self.size = size
+        self.start_location = start_location
+        self.treasure_locations = treasure_locations
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size  # None splits the generation into ~4 chunks per worker (at least MIN_CHUNK_SIZE)
+        self.backend = backend
+        self.cache = cache  # Optional FitnessCache consulted before any evaluation
+        self.sparse = sparse  # Use SparseEnvironment (no per-agent grid allocation, for large maps)
+        self.trajectory_nodes = trajectory_nodes  # Capacity of the trajectory trie of every process (0 disables it)
+        self.batch_size = batch_size  # Smallest number of agents run in the BatchMachine (0 disables it)
+        self.batch_machine = make_batch_machine(batch_size)
+        self.pool = None
+        self.results = []  # Result tuples of the agents evaluated by the last evaluate() call (cached ones included)
+        self.worker_counters = dict.fromkeys(MACHINE_COUNTERS, 0)  # Summed over the worker processes
+
+        # Machine and Environment of this process (used in serial mode and for the map fingerprint)
+        self.machine = Machine(backend=backend)
+        self.environment = make_environment(size, start_location, treasure_locations, sparse, trajectory_nodes)
+        self.fingerprint = self.environment.fingerprint()
+
+        if self.workers > 1:
+            # The process pool machinery is imported only when it is used (keeps serial start-up cheap)
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(size, start_location, treasure_locations, backend, sparse,
+                                                      trajectory_nodes, batch_size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        # Shut down the worker processes
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def evaluate(self, agents):
+        # Evaluate agents in order and return the first agent that found all treasures (or None)
+        # Agents after the solution are left unevaluated, just like the serial "Path Found" break
+        results = [None] * len(agents)
+        limit = len(agents)  # Agents from this position on are never needed
+
+        if self.cache is not None:
+            # Answer repeated genomes (elites, duplicate offspring) from the cache
+            for position, agent in enumerate(agents):
+                result = self.cache.get(self.cache.make_key(self.fingerprint, agent.inst_set))
+                if result is not None:
+                    results[position] = result
+                    if result[4]:
+                        limit = position + 1  # A cached solution ends the generation here
+                        break
+
+        # Evaluate the remaining genomes, in order, serially or on the process pool
+        missing = [position for position in range(limit) if results[position] is None]
+        computed = self.compute([agents[position].inst_set for position in missing])
+        for position, result in zip(missing, computed):
+            results[position] = result
+            if self.cache is not None:
+                self.cache.put(self.cache.make_key(self.fingerprint, agents[position].inst_set), result)
+
+        # Apply the results in order up to the first solution
+        self.results = []
+        for agent, result in zip(agents, results):
+            if result is None:
+                break  # Only happens after a solution, these agents stay unevaluated
+            self.results.append(result)
+            agent.fit_index, agent.steps, agent.treasures_found, agent.cmd_set, found = result[:5]
+            if found:
+                return agent
+        return None
+
+    def compute(self, inst_sets):
+        # Evaluate instruction sets and return their result tuples (cut after the first solution)
+        if self.chunk_size:
+            chunk_size = self.chunk_size
+        else:
+            # ~4 chunks per worker, but never chunks smaller than MIN_CHUNK_SIZE
+            num_chunks = min(self.workers * 4, len(inst_sets) // MIN_CHUNK_SIZE)
+            chunk_size = -(-len(inst_sets) // max(1, num_chunks))
+        if self.pool is None or len(inst_sets) <= chunk_size:
+            # A single chunk is evaluated in this process (no round trip to a worker)
+            batch_machine = self.batch_machine if len(inst_sets) >= self.batch_size else None
+            return evaluate_inst_sets(self.machine, self.environment, self.start_location, self.treasure_locations, inst_sets,
+                                      batch_machine=batch_machine)
+
+        # Only the instruction sets (as bytes) cross the process boundary
+        futures = [self.pool.submit(_evaluate_chunk, [bytes(inst_set) for inst_set in inst_sets[i:i + chunk_size]])
+                   for i in range(0, len(inst_sets), chunk_size)]
+
+        results = []
+        for future in futures:
+            if results and results[-1][4]:
+                future.cancel()  # Chunks after the solution are not needed anymore
+                continue
+            chunk_results, counters = future.result()
+            results.extend(chunk_results)
+            for name, value in zip(MACHINE_COUNTERS, counters):
+                self.worker_counters[name] += value
+        return results
+
+    def machine_stats(self):
+        # MACHINE_COUNTERS of the machine of this process and of every worker process
+        return {name: getattr(self.machine, name) + self.worker_counters[name] for name in MACHINE_COUNTERS}
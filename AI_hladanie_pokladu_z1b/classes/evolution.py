@@ -0,0 +1,274 @@
+import json  # JSON lines telemetry
+import random  # Random instruction sets and the distraction schedule
+import sys  # Telemetry can be streamed to stdout
+import time  # Elapsed time in the telemetry
+from collections import namedtuple  # Result of a run
+from classes.agent import Agent  # Agents of the population
+from classes.checkpoint import CheckpointWriter, load_checkpoint  # Periodic checkpoints and resume
+from classes.evaluator import ParallelEvaluator  # Fitness evaluation (serial or on a process pool)
+from classes.fitness_cache import FitnessCache  # Cache answering repeated genomes
+from classes.population import Population  # Population evolved by the runner
+from classes.scheduler import FixedCadencePolicy, Scheduler  # Distraction and mutation schedule
+
+# Outcome of a run: whether all treasures were found, the last generation and its best agent
+EvolutionResult = namedtuple('EvolutionResult', ['solved', 'generation', 'fit_index', 'treasures_found', 'cmd_set', 'fitness_history'])
+
+# Population types: list of Agent objects (classes/population.py) or NumPy genome matrix (classes/array_population.py)
+POPULATIONS = ('list', 'array')
+
+class JsonLinesSink:
+    # Telemetry sink writing one JSON object per event to a file path, an open file or '-' (stdout)
+
+    def __init__(self, target):
+        if target == '-':
+            self.file, self.owned = sys.stdout, False
+        elif hasattr(target, 'write'):
+            self.file, self.owned = target, False
+        else:
+            self.file, self.owned = open(target, "w"), True
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event) + "\n")
+        if event['event'] == 'finish':
+            self.close()
+        else:
+            self.file.flush()
+
+    def close(self):
+        if self.owned and not self.file.closed:
+            self.file.close()
+        elif not self.owned:
+            self.file.flush()
+
+class Evolution:
+    def __init__(self, game_map, num_agents=201, num_instructions=30, generations=2000,
+                 first_distraction=200, distraction_frequency=500, distraction_duration=(20, 40),
+                 seed=None, workers=1, backend='bytes', cache_capacity=100000, sparse=True, sinks=(), instrumentation=None,
+                 checkpoint_dir=None, checkpoint_every=0, checkpoint_keep=None, crossover_rate=0.1,
+                 crossover_identical_rate=0.5, random_crossover_rate=0.7, random_crossover_identical_rate=0.9,
+                 trajectory_nodes=0, batch_size=0, policy=None, population='list'):
+        # Evolutionary search of setup.py as a reusable runner:
+        # - game_map is a MapSpec (size, start location, treasure locations)
+        # - the first distraction happens at generation 'first_distraction', later ones every
+        #   'distraction_frequency' generations, each lasting a random number of generations in 'distraction_duration'
+        # - every sink is called with one dict per event ('start', 'generation', 'schedule', 'distraction', 'finish')
+        # - instrumentation (an Instrumentation) collects per-generation timers and counters during the run
+        # - with checkpoint_dir and checkpoint_every, the state is written every 'checkpoint_every' generations
+        #   in a background thread (checkpoint_keep limits the number of files kept)
+        # - the mutation rates are passed on to Population (crossover / random crossover, identical parents)
+        # - trajectory_nodes > 0 scores trajectories through a trajectory trie of that many nodes (per process)
+        # - batch_size > 0 runs the machines of generations (worker chunks) of at least batch_size agents in lockstep
+        #   with NumPy (classes/batch_machine.py)
+        # - policy (see classes/scheduler.py) decides when distractions happen and scales the mutation rates,
+        #   the default FixedCadencePolicy uses first_distraction / distraction_frequency / distraction_duration
+        # - population='array' keeps the genomes in a NumPy matrix and reproduces them in batches
+        #   (classes/array_population.py, its own random generator is seeded with 'seed'), 'list' uses Population
+        if population not in POPULATIONS:
+            raise ValueError(f"Unknown population type: {population}")
+        self.game_map = game_map
+        self.population_type = population
+        self.num_agents = num_agents
+        self.num_instructions = num_instructions
+        self.generations = generations
+        self.first_distraction = first_distraction
+        self.distraction_frequency = distraction_frequency
+        self.distraction_duration = distraction_duration
+        self.seed = seed
+        self.workers = workers
+        self.backend = backend
+        self.cache_capacity = cache_capacity
+        self.sparse = sparse
+        self.trajectory_nodes = trajectory_nodes
+        self.batch_size = batch_size
+        self.sinks = list(sinks)
+        self.instrumentation = instrumentation
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_keep = checkpoint_keep
+        self.checkpoint_writer = None
+        self.mutation_rates = {'crossover_rate': crossover_rate, 'crossover_identical_rate': crossover_identical_rate,
+                               'random_crossover_rate': random_crossover_rate,
+                               'random_crossover_identical_rate': random_crossover_identical_rate}
+
+        self.population = None  # Created by start()
+        self.evaluator = None
+        self.generation = 0  # Index of the generation being evaluated
+        if policy is None:
+            policy = FixedCadencePolicy(first_distraction, distraction_frequency, distraction_duration)
+        self.scheduler = Scheduler(policy)
+        self.ranking = None  # Ranking of the last evaluated generation
+        self.best_agent = None  # Best agent of the last evaluated generation
+        self.solution = None  # Agent that found all treasures
+        self.started_at = None
+
+    @property
+    def distractor(self):
+        # Remaining generations of the current distraction
+        return self.scheduler.policy.distractor
+
+    def emit(self, event):
+        # Send an event to every sink
+        for sink in self.sinks:
+            sink(event)
+
+    def start(self, checkpoint=None):
+        # Seed the random generator, create the evaluator and the initial random population
+        # (or restore the population and the counters from a checkpoint file)
+        if self.seed is not None:
+            random.seed(self.seed)
+        self.started_at = time.perf_counter()
+        if self.instrumentation is not None:
+            self.instrumentation.install()
+        if self.checkpoint_dir is not None and self.checkpoint_every:
+            self.checkpoint_writer = CheckpointWriter(self.checkpoint_dir, keep=self.checkpoint_keep)
+        cache = FitnessCache(self.cache_capacity) if self.cache_capacity else None
+        self.evaluator = ParallelEvaluator(*self.game_map, workers=self.workers, backend=self.backend,
+                                           cache=cache, sparse=self.sparse, trajectory_nodes=self.trajectory_nodes,
+                                           batch_size=self.batch_size)
+        if self.population_type == 'array':
+            from classes.array_population import ArrayPopulation  # NumPy is only imported for this population type
+            # The random genomes of the first generation are drawn by the population's own generator
+            self.population = ArrayPopulation(self.num_agents, self.num_instructions, seed=self.seed, **self.mutation_rates)
+        else:
+            self.population = Population(**self.mutation_rates)
+        if checkpoint is not None:
+            self.restore(load_checkpoint(checkpoint))
+        elif self.population_type == 'list':
+            for _ in range(self.num_agents):
+                # Add agents with random instruction sets (instructions are integers between 0 and 255)
+                self.population.add_agent(Agent([random.randint(0, 255) for _ in range(self.num_instructions)]))
+        self.emit({'event': 'start', 'num_agents': self.num_agents, 'num_instructions': self.num_instructions,
+                   'generations': self.generations, 'seed': self.seed, 'generation': self.generation,
+                   'resumed_from': checkpoint})
+
+    def snapshot(self):
+        # Copy of the state needed to continue the run exactly, taken after the generation was evaluated and
+        # before it reproduces (the fitness arrays are the evaluated ones, the random state the one reproduce() starts with)
+        agents = self.population.generation
+        snapshot = {
+            'generation': self.generation,
+            'num_agents': len(agents),
+            'genome_length': len(agents[0].inst_set) if agents else 0,
+            'genomes': b''.join(bytes(agent.inst_set) for agent in agents),
+            'fitness': [agent.fit_index for agent in agents],
+            'steps': [agent.steps for agent in agents],
+            'treasures': [agent.treasures_found for agent in agents],
+            'meta': {
+                'scheduler': self.scheduler.state(),
+                'fitness_history': list(self.population.fitness_history),
+                'first_i': self.population.first_i,
+                'random_state': random.getstate(),
+            },
+        }
+        if self.population_type == 'array':
+            snapshot['meta']['array_random_state'] = self.population.rng.bit_generator.state
+        return snapshot
+
+    def restore(self, state):
+        # Rebuild the population and the counters from a snapshot / checkpoint
+        meta = state['meta']
+        if self.population_type == 'array':
+            self.population.load(state['genomes'], state['fitness'], state['steps'], state['treasures'])
+            self.population.rng.bit_generator.state = meta['array_random_state']
+        else:
+            length = state['genome_length']
+            genomes = state['genomes']
+            for index in range(state['num_agents']):
+                agent = Agent(list(genomes[index * length:(index + 1) * length]))
+                agent.fit_index = state['fitness'][index]
+                agent.steps = state['steps'][index]
+                agent.treasures_found = state['treasures'][index]
+                self.population.add_agent(agent)
+        self.generation = state['generation']
+        self.scheduler.restore(meta['scheduler'])
+        self.population.fitness_history = list(meta['fitness_history'])
+        self.population.first_i = meta['first_i']
+        version, internal_state, gauss_next = meta['random_state']
+        random.setstate((version, tuple(internal_state), gauss_next))
+        # The checkpointed generation is evaluated, rank it for reproduce()
+        self.ranking = self.population.rank()
+        self.best_agent = self.population[self.ranking.best()]
+
+    def save_checkpoint(self):
+        # Hand a snapshot to the background writer
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.save(self.snapshot())
+
+    def evaluate(self):
+        # Evaluate the current generation and rank it once, returns the agent that found all treasures (or None)
+        if self.instrumentation is not None:
+            self.instrumentation.start_generation(self.generation)
+        self.solution = self.evaluator.evaluate(self.population.generation)
+        self.ranking = self.population.rank()
+        # Without a solution the best agent is the first agent with the highest fitness
+        self.best_agent = self.solution if self.solution is not None else self.population[self.ranking.best()]
+        self.population.fitness_history.append(self.best_agent.fit_index)
+        self.population.first_i = self.best_agent.fit_index
+        if self.instrumentation is not None:
+            self.instrumentation.observe_population(self.population.generation)
+        stats = self.scheduler.observe(self.generation, self.best_agent.fit_index, self.population.generation)
+        event = {'event': 'generation', 'generation': self.generation, 'best_fitness': self.best_agent.fit_index,
+                 'treasures_found': self.best_agent.treasures_found, 'steps': len(self.best_agent.cmd_set),
+                 'solved': self.solution is not None, 'distractor': self.distractor, 'plateau': stats.plateau,
+                 'elapsed': time.perf_counter() - self.started_at}
+        if stats.unique_ratio is not None:
+            event['unique_ratio'], event['entropy'] = stats.unique_ratio, stats.entropy
+        self.emit(event)
+        return self.solution
+
+    def reproduce(self):
+        # Create the next generation as decided by the scheduler policy (distraction or normal, mutation rates)
+        decision = self.scheduler.decide()
+        if decision.reason is not None:
+            stats = self.scheduler.stats
+            self.emit({'event': 'schedule', 'generation': self.generation, 'reason': decision.reason,
+                       'distract': decision.distract, 'mutation_scale': decision.mutation_scale,
+                       'plateau': stats.plateau, 'unique_ratio': stats.unique_ratio, 'entropy': stats.entropy})
+        for name, rate in self.mutation_rates.items():
+            setattr(self.population, name, min(1.0, rate * decision.mutation_scale))
+        self.population.create_new_generation(decision.distract, self.ranking)
+        event = self.scheduler.applied()
+        if event is not None:
+            self.emit(event)
+        self.generation += 1
+
+    def finish(self):
+        # Shut down the evaluator and report the result
+        self.evaluator.close()
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()  # Wait for the pending checkpoints
+        if self.instrumentation is not None:
+            self.instrumentation.finish()
+        result = self.result()
+        self.emit({'event': 'finish', 'solved': result.solved, 'generation': result.generation,
+                   'best_fitness': result.fit_index, 'treasures_found': result.treasures_found,
+                   'steps': len(result.cmd_set), 'path': ''.join(result.cmd_set),
+                   'elapsed': time.perf_counter() - self.started_at})
+        return result
+
+    def result(self):
+        best = self.best_agent
+        return EvolutionResult(self.solution is not None, self.generation, best.fit_index, best.treasures_found,
+                               list(best.cmd_set), list(self.population.fitness_history))
+
+    def run(self, checkpoint=None):
+        # Run generations until all treasures are found or the generation limit is reached
+        # With 'checkpoint' the run continues from that checkpoint file
+        self.start(checkpoint)
+        try:
+            if checkpoint is not None:
+                self.reproduce()  # The checkpoint holds an evaluated generation, continue with its offspring
+            while True:
+                if self.evaluate() is not None or self.generation >= self.generations - 1:
+                    break
+                if self.checkpoint_every and self.generation % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+                self.reproduce()
+        except BaseException:
+            self.evaluator.close()
+            if self.instrumentation is not None:
+                self.instrumentation.finish()  # Never leave the wrapped methods installed
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.close()
+            raise
+        return self.finish()
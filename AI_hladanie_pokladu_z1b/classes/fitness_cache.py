@@ -0,0 +1,55 @@
+from collections import OrderedDict  # Ordered dictionary keeps the least recently used entry first
+
+class FitnessCache:
+    def __init__(self, capacity=100000):
+        # Bounded cache of evaluation results keyed by (map fingerprint, instruction bytes)
+        # Each value is a result tuple of evaluate_inst_sets (fit_index, steps, treasures_found, cmd_set, found, ...)
+        if capacity <= 0:
+            raise ValueError("Cache capacity must be positive")
+        self.capacity = capacity  # Maximum number of stored results
+        self.entries = OrderedDict()  # Stored results, least recently used first
+        self.hits = 0  # Number of lookups answered from the cache
+        self.misses = 0  # Number of lookups that required an evaluation
+        self.evictions = 0  # Number of results dropped because the cache was full
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def make_key(fingerprint, inst_set):
+        # The evaluation depends only on the instruction set and the map
+        return fingerprint, bytes(inst_set)
+
+    def get(self, key):
+        # Return the cached result (or None) and mark it as the most recently used one
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        # Store a result, evicting the least recently used one when the cache is full
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        # Drop all stored results (counters are kept)
+        self.entries.clear()
+
+    def stats(self):
+        # Summary of the cache counters
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,188 @@
+import csv  # CSV export of the per-generation records
+import json  # JSON export of the per-generation records
+import time  # Phase timers
+from classes.agent import Agent  # Agent.mutate is timed
+from classes.environment import Environment  # Environment.fitness_function is timed
+from classes.evaluator import MACHINE_COUNTERS, ParallelEvaluator  # Whole-generation evaluation is timed, its results are counted
+from classes.machine import Machine  # Machine.execute_commands is timed
+from classes.population import Population  # Ranking and reproduction are timed
+from classes.trajectory_cache import TrieEnvironment  # Its fitness_function overrides the timed one
+
+# (phase name, class, method name) of every instrumented hot-path method
+# Phases nest: evaluate contains execute_commands and fitness_function, create_new_generation contains crossover and mutate
+# execute_commands and fitness_function run in this process only, they are measured with a serial evaluator
+PHASES = (
+    ('evaluate', ParallelEvaluator, 'evaluate'),
+    ('execute_commands', Machine, 'execute_commands'),
+    ('fitness_function', Environment, 'fitness_function'),
+    ('fitness_function', TrieEnvironment, 'fitness_function'),
+    ('rank', Population, 'rank'),
+    ('create_new_generation', Population, 'create_new_generation'),
+    ('crossover', Population, 'crossover'),
+    ('random_crossover', Population, 'random_crossover'),
+    ('mutate', Agent, 'mutate'),
+)
+
+PHASE_NAMES = tuple(dict.fromkeys(phase for phase, _, _ in PHASES))  # Every phase once, in order
+
+VM_STEP_BUCKET = 50  # Width of the buckets of the VM step histogram
+
+class Instrumentation:
+    def __init__(self, profile_generations=None, profile_path=None):
+        # Per-generation timers and counters of the hot-path methods
+        # The methods are wrapped only between install() and uninstall(), so a run without
+        # instrumentation executes the original methods with no overhead at all
+        # profile_generations=(first, last) runs cProfile for that inclusive range of generations
+        self.profile_generations = profile_generations
+        self.profile_path = profile_path  # File for the cProfile dump (pstats format)
+        self.profiler = None
+        self.originals = []  # (class, method name, original function) of the wrapped methods
+        self.records = []  # Finished per-generation records
+        self.current = None  # Record of the generation being measured
+
+    def new_record(self, generation):
+        return {
+            'generation': generation,
+            'times': {phase: 0.0 for phase in PHASE_NAMES},
+            'calls': {phase: 0 for phase in PHASE_NAMES},
+            # Penalties and VM steps of every evaluated agent, taken from the evaluation results
+            # (agents answered by the fitness cache or evaluated by worker processes are counted too)
+            'max_instructions_reached': 0,
+            'out_of_bound': 0,
+            # Endless loops stopped by the cycle detection and the instructions it saved (machines of the
+            # worker processes included, agents answered by the fitness cache are not executed)
+            'cycles_detected': 0,
+            'steps_saved': 0,
+            'vm_steps': {},  # Histogram: bucket start -> number of agents
+            'unique_genomes': 0,
+            'population': 0,
+        }
+
+    def install(self):
+        # Replace the hot-path methods with timed wrappers
+        if self.originals:
+            return
+        for phase, owner, name in PHASES:
+            function = owner.__dict__[name]
+            self.originals.append((owner, name, function))
+            setattr(owner, name, self.wrap(phase, function))
+
+    def uninstall(self):
+        # Restore the original methods
+        for owner, name, function in self.originals:
+            setattr(owner, name, function)
+        self.originals = []
+
+    def wrap(self, phase, function):
+        instrumentation = self
+
+        if phase == 'evaluate':
+            def wrapper(evaluator, *args, **kwargs):
+                counters = evaluator.machine_stats()
+                start = time.perf_counter()
+                try:
+                    return function(evaluator, *args, **kwargs)
+                finally:
+                    instrumentation.add_time(phase, time.perf_counter() - start)
+                    instrumentation.observe_results(evaluator.results)
+                    instrumentation.observe_machines(counters, evaluator.machine_stats())
+        else:
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    instrumentation.add_time(phase, time.perf_counter() - start)
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def add_time(self, phase, elapsed):
+        if self.current is not None:
+            self.current['times'][phase] += elapsed
+            self.current['calls'][phase] += 1
+
+    def count(self, counter):
+        if self.current is not None:
+            self.current[counter] += 1
+
+    def observe_results(self, results):
+        # Count the penalties and the VM steps of the result tuples of one evaluate() call
+        if self.current is None:
+            return
+        histogram = self.current['vm_steps']
+        for result in results:
+            penalty, steps = result[5], result[6]
+            if penalty is not None:
+                self.current[penalty] += 1
+            bucket = steps - steps % VM_STEP_BUCKET
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def observe_machines(self, before, after):
+        # Add the increase of the machine counters during one evaluate() call
+        if self.current is None:
+            return
+        for name in MACHINE_COUNTERS:
+            self.current[name] += after[name] - before[name]
+
+    def start_generation(self, generation):
+        # Close the previous generation and start measuring the next one
+        self.end_generation()
+        self.current = self.new_record(generation)
+        if self.profile_generations is not None:
+            first, last = self.profile_generations
+            if generation == first:
+                import cProfile  # Loaded only when profiling was requested
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            elif generation > last and self.profiler is not None:
+                self.stop_profiler()
+
+    def observe_population(self, agents):
+        # Genome diversity of the evaluated generation (number of distinct instruction sets)
+        if self.current is not None:
+            self.current['population'] = len(agents)
+            self.current['unique_genomes'] = len({bytes(agent.inst_set) for agent in agents})
+
+    def end_generation(self):
+        if self.current is not None:
+            self.records.append(self.current)
+            self.current = None
+
+    def stop_profiler(self):
+        self.profiler.disable()
+        if self.profile_path is not None:
+            self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+
+    def finish(self):
+        # Close the last generation, write the profile and restore the original methods
+        self.end_generation()
+        if self.profiler is not None:
+            self.stop_profiler()
+        self.uninstall()
+
+    def export_json(self, path):
+        with open(path, "w") as file:
+            json.dump(self.records, file, indent=1)
+
+    def export_csv(self, path):
+        # One row per generation, times and calls flattened into columns, the histogram as "bucket:count" pairs
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            phases = PHASE_NAMES
+            writer.writerow(['generation'] + [f'{phase}_seconds' for phase in phases] + [f'{phase}_calls' for phase in phases]
+                            + ['max_instructions_reached', 'out_of_bound', 'cycles_detected', 'steps_saved', 'unique_genomes',
+                               'population', 'vm_steps'])
+            for record in self.records:
+                histogram = ' '.join(f'{bucket}:{count}' for bucket, count in sorted(record['vm_steps'].items()))
+                writer.writerow([record['generation']] + [record['times'][phase] for phase in phases]
+                                + [record['calls'][phase] for phase in phases]
+                                + [record['max_instructions_reached'], record['out_of_bound'], record['cycles_detected'],
+                                   record['steps_saved'], record['unique_genomes'], record['population'], histogram])
+
+    def export(self, path):
+        # Export by file extension (.csv or JSON otherwise)
+        if path.endswith('.csv'):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
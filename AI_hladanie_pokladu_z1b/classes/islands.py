@@ -0,0 +1,175 @@
+import multiprocessing  # Every island evolves in its own process
+import random  # Random migration topology
+from collections import namedtuple  # Result records sent back to the parent process
+from classes.agent import Agent  # Agents of the island populations
+from classes.evolution import Evolution  # Generation loop run by every island
+from classes.scheduler import POLICIES  # Scheduler policy of every island, created inside the island process
+
+# Best agent of one island (or of the whole archipelago)
+IslandResult = namedtuple('IslandResult', ['island', 'generation', 'fit_index', 'treasures_found', 'cmd_set', 'solved', 'fitness_history'])
+
+# Migrant sent to a neighbour island: genome plus its evaluation, so it can compete in selection right away
+Migrant = namedtuple('Migrant', ['inst_set', 'fit_index', 'steps', 'treasures_found', 'cmd_set'])
+
+TOPOLOGIES = ('ring', 'random')
+
+def migration_offset(topology, seed, epoch, num_islands):
+    # Island k sends its migrants to island (k + offset) % num_islands
+    # Every island computes the same offset, so each island receives exactly one migrant group per epoch
+    if topology == 'ring' or num_islands < 3:
+        return 1
+    return random.Random(seed * 1000003 + epoch).randint(1, num_islands - 1)
+
+def _run_island(island, config, control, inboxes):
+    # Evolution loop of one island (runs in a child process)
+    # The fixed cadence is the default policy of Evolution (it uses the distraction parameters of the options)
+    policy = POLICIES[config['scheduler']]() if config['scheduler'] != 'fixed' else None
+    evolution = Evolution(config['game_map'], num_agents=config['num_agents'], num_instructions=config['num_instructions'],
+                          generations=config['generations'], seed=config['seed'] * 1000003 + island + 1, workers=1,
+                          policy=policy, **config['options'])
+    evolution.start()
+    population = evolution.population
+    best = None  # Best agent seen by this island
+    epoch = 0
+
+    while True:
+        i = evolution.generation
+        solution = evolution.evaluate()
+        best_agent = evolution.best_agent
+        if best is None or best_agent.fit_index > best.fit_index or solution is not None:
+            best = IslandResult(island, i, best_agent.fit_index, best_agent.treasures_found,
+                                list(best_agent.cmd_set), solution is not None, None)
+
+        last_generation = i == config['generations'] - 1
+        if solution is not None or last_generation or (i + 1) % config['migration_interval'] == 0:
+            # Report to the parent, which decides whether the whole archipelago stops
+            control.send((i, solution is not None))
+            if control.recv() == 'stop' or solution is not None or last_generation:
+                break
+
+            # Send the top agents to the destination island and replace the worst agents with the received ones
+            offset = migration_offset(config['topology'], config['seed'], epoch, config['num_islands'])
+            destination = (island + offset) % config['num_islands']
+            emigrants = [population[index] for index in evolution.ranking.top(config['migration_size'])]
+            inboxes[destination].put([Migrant(list(agent.inst_set), agent.fit_index, agent.steps,
+                                              agent.treasures_found, list(agent.cmd_set)) for agent in emigrants])
+            immigrants = inboxes[island].get()
+            worst = sorted(range(population.num_agents), key=lambda index: population[index].fit_index)
+            for index, migrant in zip(worst, immigrants):
+                agent = Agent(list(migrant.inst_set))
+                agent.fit_index, agent.steps = migrant.fit_index, migrant.steps
+                agent.treasures_found, agent.cmd_set = migrant.treasures_found, migrant.cmd_set
+                population.generation[index] = agent
+            evolution.ranking = population.rank()  # Immigrants take part in the selection of the next generation
+            epoch += 1
+
+        evolution.reproduce()  # Same distraction schedule as the single population run
+
+    evolution.evaluator.close()
+    control.send(best._replace(fitness_history=population.fitness_history))
+    control.close()
+
+class IslandModel:
+    def __init__(self, game_map, num_islands=4, num_agents=201, num_instructions=30, generations=2000,
+                 migration_interval=50, migration_size=5, topology='ring', seed=0, backend='bytes',
+                 cache_capacity=100000, sparse=True, trajectory_nodes=0, batch_size=0, scheduler='fixed', first_distraction=200,
+                 distraction_frequency=500, distraction_duration=(20, 40), crossover_rate=0.1,
+                 crossover_identical_rate=0.5, random_crossover_rate=0.7, random_crossover_identical_rate=0.9):
+        # K island populations evolving in separate processes, exchanging their top agents
+        # every 'migration_interval' generations in a ring or random topology
+        # seed=None picks a random seed (the islands are still seeded differently from it)
+        # scheduler is a name of classes/scheduler.py POLICIES, the other parameters are passed on to every Evolution
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology: {topology}")
+        if scheduler not in POLICIES:
+            raise ValueError(f"Unknown scheduler policy: {scheduler}")
+        if migration_size >= num_agents:
+            raise ValueError("Migration size must be smaller than the island population")
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        self.config = {
+            'game_map': game_map,
+            'num_islands': num_islands,
+            'num_agents': num_agents,
+            'num_instructions': num_instructions,
+            'generations': generations,
+            'migration_interval': migration_interval,
+            'migration_size': migration_size,
+            'topology': topology,
+            'seed': seed,
+            'scheduler': scheduler,
+            'options': {
+                'backend': backend,
+                'cache_capacity': cache_capacity,
+                'sparse': sparse,
+                'trajectory_nodes': trajectory_nodes,
+                'batch_size': batch_size,
+                'first_distraction': first_distraction,
+                'distraction_frequency': distraction_frequency,
+                'distraction_duration': tuple(distraction_duration),
+                'crossover_rate': crossover_rate,
+                'crossover_identical_rate': crossover_identical_rate,
+                'random_crossover_rate': random_crossover_rate,
+                'random_crossover_identical_rate': random_crossover_identical_rate,
+            },
+        }
+        self.results = []  # Best result of every island after run()
+
+    def run(self):
+        # Run all islands and return the best result across the archipelago
+        num_islands = self.config['num_islands']
+        inboxes = [multiprocessing.Queue() for _ in range(num_islands)]  # Migrant inbox of every island
+        controls = []
+        processes = []
+        for island in range(num_islands):
+            parent_end, child_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_run_island, args=(island, self.config, child_end, inboxes))
+            process.start()
+            controls.append(parent_end)
+            processes.append(process)
+
+        # Synchronise the islands at every migration point, all of them stop once any island is solved
+        running = set(range(num_islands))
+        results = {}
+        while running:
+            reports = {}
+            for island in sorted(running):
+                message = controls[island].recv()
+                if isinstance(message, IslandResult):
+                    results[island] = message  # The island finished its generations
+                else:
+                    reports[island] = message
+            running = set(reports)
+            stop = any(solved for _, solved in reports.values())
+            for island in sorted(running):
+                controls[island].send('stop' if stop else 'migrate')
+            if stop:
+                for island in sorted(running):
+                    results[island] = controls[island].recv()
+                running = set()
+            else:
+                # Islands that reported their last generation are done as well
+                for island in sorted(running):
+                    if reports[island][0] == self.config['generations'] - 1:
+                        results[island] = controls[island].recv()
+                        running.discard(island)
+
+        for process in processes:
+            process.join()
+        self.results = [results[island] for island in range(num_islands)]
+        return self.best()
+
+    def best(self):
+        # Best result across all islands: solved first, then the highest fitness, then the earliest generation
+        return max(self.results, key=lambda result: (result.solved, result.fit_index, -result.generation))
+
+    def report(self):
+        # Text report with the best agent of every island and the best result across all islands
+        lines = []
+        for result in self.results:
+            lines.append(f"Island {result.island}: fitness {result.fit_index:.2f}, treasures {result.treasures_found}, "
+                         f"steps {len(result.cmd_set)}, generation {result.generation}{', solved' if result.solved else ''}")
+        best = self.best()
+        lines.append(f"Best: island {best.island}, generation {best.generation}, treasures {best.treasures_found}, "
+                     f"steps {len(best.cmd_set)}, path {''.join(best.cmd_set)}")
+        return "\n".join(lines)
@@ -1,11 +1,50 @@
 # Custom exception to handle when the number of executed instructions exceeds a limit (500 instructions)
 class MaxInstructionsReached(Exception):
-    pass
+    def __init__(self, steps_saved=0):
+        super().__init__()
+        self.steps_saved = steps_saved  # Instructions skipped because an endless loop was detected early
+
+# Movement decoded from the number of '1's in an output command (H = Up, D = Down, P = Right, L = Left)
+def _decode_move(value):
+    move = bin(value).count('1')
+    if move < 3:
+        return "H"
+    elif 3 <= move < 4:
+        return "D"
+    elif move in [5, 6]:
+        return "P"
+    return "L"
+
+# Precomputed decode tables indexed by the 8-bit command value (used by the 'bytes' backend)
+OPCODES = tuple(value >> 6 for value in range(256))  # First 2 bits: command type
+ADDRESSES = tuple(value & 0b111111 for value in range(256))  # Last 6 bits: memory address
+MOVES = tuple(_decode_move(value) for value in range(256))  # Movement for output commands
+INCREMENTS = tuple((value + 1) % 256 for value in range(256))  # Increment with wrap-around at 255
+DECREMENTS = tuple((value - 1) % 256 for value in range(256))  # Decrement with wrap-around at 0
 
 class Machine:
     ARCHITECTURE = 64  # Define the memory architecture size (64 memory addresses)
+    MAX_INSTRUCTIONS = 500  # Maximum number of executed instructions before MaxInstructionsReached
+    BACKENDS = ('string', 'bytes')  # Supported memory representations
+
+    def __init__(self, backend='string', detect_cycles=True):
+        # backend='string' keeps memory as 8-character binary strings (original interpreter)
+        # backend='bytes' keeps memory in a bytearray and decodes commands through lookup tables
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown machine backend: {backend}")
+        self.backend = backend
+
+        # With detect_cycles the machine stops as soon as a jump closes a loop whose iteration did not write
+        # to any of the commands it executed. The next iteration runs the same commands again, so the program
+        # can never halt and MaxInstructionsReached is raised right away instead of after 500 steps.
+        self.detect_cycles = detect_cycles
+        self.cycles_detected = 0  # Number of executions stopped by the cycle detection
+        self.steps_saved = 0  # Total number of instructions skipped thanks to the cycle detection
+        self.instructions = 0  # Number of instructions executed by the last execute_commands call
+
+        # Data memory of the 'bytes' backend (64 addresses, one byte each)
+        self.data = bytearray(self.ARCHITECTURE)
 
-    def __init__(self):
         # Initialize memory for the machine
         # The memory is a 2D list with 64 addresses. Each address has an index (in binary) and an 8-bit value.
         self.memory = [[0 for _ in range(self.ARCHITECTURE)] for _ in range(2)]
@@ -18,6 +57,9 @@ class Machine:
         self.clear_memory()
 
     def clear_memory(self):
+        if self.backend == 'bytes':
+            self.data[:] = bytes(self.ARCHITECTURE)  # Zero the whole bytearray in one slice assignment
+            return
         # Resets the memory by setting all values in the second row (data) to '00000000' (8-bit zeroes)
         for value in range(self.ARCHITECTURE):
             self.memory[1][value] = '0' * 8
@@ -25,6 +67,11 @@ class Machine:
     def fill_memory(self, input_arr):
         # Fill the memory with input values from the agent's instruction set
         # Only fills up to 64 memory addresses or the length of the input array, whichever is smaller
+        if self.backend == 'bytes':
+            for value in range(min(self.ARCHITECTURE, len(input_arr))):
+                if input_arr[value] is not None:
+                    self.data[value] = input_arr[value]
+            return
         for value in range(min(self.ARCHITECTURE, len(input_arr))):
             if input_arr[value] is not None:
                 self.memory[1][value] = self.decimal_to_binary(input_arr[value], 8)  # Convert values to 8-bit binary
@@ -32,34 +79,121 @@ class Machine:
     def display_memory(self):
         # Display the memory contents (address in the first row, data in the second row)
         for column in range(len(self.memory[0])):
-            print(f"{self.memory[0][column]} {self.memory[1][column]}")
+            if self.backend == 'bytes':
+                print(f"{self.memory[0][column]} {self.decimal_to_binary(self.data[column], 8)}")
+            else:
+                print(f"{self.memory[0][column]} {self.memory[1][column]}")
         print()
 
+    def loop_is_endless(self, previous, last_visit, writes):
+        # The loop since the previous execution of the current jump repeats forever if none of its
+        # writes targeted a command executed during that iteration (executed at or after 'since')
+        since, first_write = previous
+        for address in writes[first_write:]:
+            if last_visit[address] >= since:
+                return False
+        return True
+
+    def cycle_detected(self, instructions):
+        # Record an early stop and raise the same exception as the instruction limit
+        steps_saved = self.MAX_INSTRUCTIONS - instructions
+        self.instructions = instructions
+        self.cycles_detected += 1
+        self.steps_saved += steps_saved
+        raise MaxInstructionsReached(steps_saved)
+
     def execute_commands(self):
+        # Dispatch to the interpreter matching the memory representation
+        if self.backend == 'bytes':
+            return self.execute_commands_bytes()
+        return self.execute_commands_string()
+
+    def execute_commands_bytes(self):
+        # Same semantics as execute_commands_string, but the memory is a bytearray and every
+        # command is decoded through the precomputed 256-entry tables instead of string slicing
+        data = self.data
+        opcodes, addresses, moves = OPCODES, ADDRESSES, MOVES
+        increments, decrements = INCREMENTS, DECREMENTS
+        architecture = self.ARCHITECTURE
+        max_instructions = self.MAX_INSTRUCTIONS
+        instructions = 0  # Counter for the number of executed instructions
+        index = 0  # Index in the memory to fetch the next command
+        trajectory = []  # List to store the agent's movement commands ('H', 'D', 'P', 'L')
+        detect_cycles = self.detect_cycles
+        last_visit = [-1] * architecture  # Instruction count at which every address was last executed
+        jump_visits = {}  # Jump address -> (instruction count, number of writes) at its last execution
+        writes = []  # Addresses written by increment/decrement commands, in execution order
+
+        while index < architecture:
+            if instructions >= max_instructions:
+                self.instructions = instructions
+                raise MaxInstructionsReached()  # Raise an exception if more than 500 instructions are executed
+
+            current_cmd = data[index]  # Fetch the current command byte from memory
+            cmd = opcodes[current_cmd]
+            last_visit[index] = instructions
+            instructions += 1
+
+            if cmd == 0:
+                address = addresses[current_cmd]
+                data[address] = increments[data[address]]  # Increment with wrap-around
+                writes.append(address)
+            elif cmd == 1:
+                address = addresses[current_cmd]
+                data[address] = decrements[data[address]]  # Decrement with wrap-around
+                writes.append(address)
+            elif cmd == 2:
+                if detect_cycles:
+                    previous = jump_visits.get(index)
+                    if previous is not None and self.loop_is_endless(previous, last_visit, writes):
+                        self.cycle_detected(instructions)
+                    jump_visits[index] = (instructions - 1, len(writes))
+                index = addresses[current_cmd]  # Jump directly to the target address
+                continue
+            else:
+                trajectory.append(moves[current_cmd])  # Output the precomputed movement
+            index += 1
+        self.instructions = instructions
+        return trajectory
+
+    def execute_commands_string(self):
         # Executes the commands stored in memory and generates a movement trajectory for the agent
         instructions = 0  # Counter for the number of executed instructions
         index = 0  # Index in the memory to fetch the next command
         trajectory = []  # List to store the agent's movement commands ('H', 'D', 'P', 'L')
+        last_visit = [-1] * self.ARCHITECTURE  # Instruction count at which every address was last executed
+        jump_visits = {}  # Jump address -> (instruction count, number of writes) at its last execution
+        writes = []  # Addresses written by increment/decrement commands, in execution order
 
         # Main execution loop that processes commands until the end of memory or an instruction limit is reached
         while index < self.ARCHITECTURE:
-            if instructions >= 500: 
+            if instructions >= self.MAX_INSTRUCTIONS:
+                self.instructions = instructions
                 raise MaxInstructionsReached()  # Raise an exception if more than 500 instructions are executed
 
             current_cmd = self.memory[1][index]  # Fetch the current 8-bit command from memory
             cmd = self.binary_to_decimal(current_cmd[:2])  # The first 2 bits represent the command type
             address = self.binary_to_decimal(current_cmd[2:])  # The last 6 bits represent the memory address
+            last_visit[index] = instructions  # Remember when this address was executed (cycle detection)
             instructions += 1  # Increment the instruction counter
 
             # Execute the command based on the 2-bit 'cmd' value
             if cmd == 0:
                 # Command 0: Increment the value at the specified memory address
                 self.memory[1][address] = self.increment_binary(self.memory[1][address])  
+                writes.append(address)
             elif cmd == 1:
                 # Command 1: Decrement the value at the specified memory address
                 self.memory[1][address] = self.decrement_binary(self.memory[1][address])
+                writes.append(address)
             elif cmd == 2:
                 # Command 2: Jump to a specified memory address
+                if self.detect_cycles:
+                    # Stop if the loop closed by this jump can never end
+                    previous = jump_visits.get(index)
+                    if previous is not None and self.loop_is_endless(previous, last_visit, writes):
+                        self.cycle_detected(instructions)
+                    jump_visits[index] = (instructions - 1, len(writes))
                 index = address  # Set index to the address to jump to
                 continue  # Skip the normal index increment to jump directly
             elif cmd == 3:
@@ -75,6 +209,7 @@ class Machine:
                 else:
                     trajectory.append("L")  # Move Left
             index += 1  # Move to the next memory address for the next instruction
+        self.instructions = instructions
         return trajectory  # Return the complete movement trajectory of the agent
 
     # Helper functions for binary operations
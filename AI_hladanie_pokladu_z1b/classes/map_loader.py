@@ -0,0 +1,48 @@
+import glob  # Map files of a directory
+import os  # Map names from file names
+from collections import namedtuple  # Immutable record describing one map
+
+# Parsed map: grid size, start location (x, y) and a tuple of treasure locations (x, y)
+MapSpec = namedtuple('MapSpec', ['size', 'start_location', 'treasure_locations'])
+
+class MapFormatError(ValueError):
+    pass
+
+def parse_point(text):
+    # Parse a location written as "[x,y]" without evaluating the text as Python code
+    text = text.strip()
+    if not (text.startswith('[') and text.endswith(']')):
+        raise MapFormatError(f"Invalid location: {text!r}")
+    parts = text[1:-1].split(',')
+    if len(parts) != 2:
+        raise MapFormatError(f"Invalid location: {text!r}")
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        raise MapFormatError(f"Invalid location: {text!r}") from None
+
+def parse_map(lines):
+    # Parse the input format: size, start location, number of treasures, one treasure location per line
+    lines = [line.strip() for line in lines if line.strip()]
+    try:
+        size = int(lines[0])
+        start_location = parse_point(lines[1])
+        num_treasures = int(lines[2])
+    except (IndexError, ValueError) as error:
+        raise MapFormatError(f"Invalid map header: {error}") from None
+    if len(lines) < 3 + num_treasures:
+        raise MapFormatError(f"Expected {num_treasures} treasure locations, found {len(lines) - 3}")
+    treasure_locations = tuple(parse_point(line) for line in lines[3:3 + num_treasures])
+    return MapSpec(size, start_location, treasure_locations)
+
+def load_map(file_path):
+    # Read and parse a map file once, the returned MapSpec is immutable and can be shared freely
+    with open(file_path, "r") as file:
+        return parse_map(file.readlines())
+
+def load_map_directory(directory, pattern="*.txt"):
+    # Load every map file of a directory (sorted by file name), returns a list of (name, MapSpec)
+    maps = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        maps.append((os.path.splitext(os.path.basename(path))[0], load_map(path)))
+    return maps
@@ -0,0 +1,135 @@
+import csv  # Streamed results table
+import os  # Default number of worker processes
+from collections import namedtuple  # Result rows
+from classes.checkpoint import load_checkpoint  # Genomes of a saved population
+from classes.environment import SparseEnvironment  # Environment reused per map inside every worker
+from classes.agent import Agent  # Agents rebuilt from the genomes for the fitness walk
+from classes.evaluator import run_program, score_trajectory  # Machine run and fitness walk of a genome
+from classes.fitness_cache import FitnessCache  # Trajectories of the genomes, shared by all maps
+from classes.machine import Machine  # Machine reused by every worker
+
+# Fitness of one genome on one map
+MapResult = namedtuple('MapResult', ['map_name', 'genome', 'fit_index', 'steps', 'treasures_found', 'solved'])
+
+# Fitness of one genome over all maps
+AggregateResult = namedtuple('AggregateResult', ['genome', 'maps', 'total_fitness', 'mean_fitness', 'treasures_found', 'maps_solved'])
+
+def _make_state(maps, backend, trajectory_capacity):
+    # Evaluation state: one Machine, one lazily created Environment per map and the trajectory cache
+    # The machine run of a genome does not depend on the map, so it is cached by the genome bytes and
+    # only the fitness walk is repeated on the other maps
+    trajectories = FitnessCache(trajectory_capacity) if trajectory_capacity else None
+    return {'maps': maps, 'machine': Machine(backend=backend), 'environments': {}, 'trajectories': trajectories}
+
+# State of a pool worker process (a serial MapRunner keeps its state on the instance)
+_worker_state = {}
+
+def _init_worker(maps, backend, trajectory_capacity):
+    _worker_state.update(_make_state(maps, backend, trajectory_capacity))
+
+def _evaluate_unit(state, map_index, first_genome, inst_sets):
+    # Evaluate one (map, chunk of genomes) work unit, returns its MapResult rows
+    name, game_map = state['maps'][map_index]
+    environments = state['environments']
+    if map_index not in environments:
+        environments[map_index] = SparseEnvironment(*game_map)
+    environment = environments[map_index]
+    machine = state['machine']
+    trajectories = state['trajectories']
+    results = []
+    for offset, inst_set in enumerate(inst_sets):
+        run = trajectories.get(inst_set) if trajectories is not None else None
+        if run is None:
+            run = run_program(machine, inst_set)  # (trajectory, instructions)
+            if trajectories is not None:
+                trajectories.put(inst_set, run)
+        agent = Agent(list(inst_set))
+        found, _ = score_trajectory(environment, agent, run[0], game_map.start_location, game_map.treasure_locations)
+        results.append(MapResult(name, first_genome + offset, agent.fit_index, agent.steps, agent.treasures_found, found))
+    return results
+
+def _evaluate_worker_unit(map_index, first_genome, inst_sets):
+    return _evaluate_unit(_worker_state, map_index, first_genome, inst_sets)
+
+def genomes_from_checkpoint(path, top=None):
+    # Genomes of a checkpointed population, with 'top' only the best 'top' agents (a frozen best-genome set)
+    state = load_checkpoint(path)
+    length = state['genome_length']
+    indices = range(state['num_agents'])
+    if top is not None:
+        indices = sorted(indices, key=lambda index: state['fitness'][index], reverse=True)[:top]
+    return [state['genomes'][index * length:(index + 1) * length] for index in indices]
+
+class MapRunner:
+    def __init__(self, maps, workers=None, chunk_size=256, backend='bytes', trajectory_capacity=100000):
+        # maps is a list of (name, MapSpec), e.g. from load_map_directory
+        # Work is split into (map x chunk of genomes) units scheduled on a process pool (workers=1 runs serially)
+        # Every process keeps the trajectories of up to trajectory_capacity genomes (0 disables the cache), a
+        # genome whose trajectory is cached skips the machine run on the following maps
+        self.maps = list(maps)
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.backend = backend
+        self.pool = None
+        self.state = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.maps, backend, trajectory_capacity))
+        else:
+            self.state = _make_state(self.maps, backend, trajectory_capacity)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def work_units(self, inst_sets):
+        # (map index, index of the first genome, genomes as bytes) for every map and chunk
+        chunks = [(start, [bytes(inst_set) for inst_set in inst_sets[start:start + self.chunk_size]])
+                  for start in range(0, len(inst_sets), self.chunk_size)]
+        for map_index in range(len(self.maps)):
+            for start, chunk in chunks:
+                yield map_index, start, chunk
+
+    def iter_results(self, inst_sets):
+        # Yield MapResult rows map by map, chunk by chunk, as soon as each work unit is done
+        if self.pool is None:
+            for unit in self.work_units(inst_sets):
+                yield from _evaluate_unit(self.state, *unit)
+            return
+        futures = [self.pool.submit(_evaluate_worker_unit, *unit) for unit in self.work_units(inst_sets)]
+        for future in futures:
+            yield from future.result()
+
+    def aggregate(self, inst_sets):
+        # Combine the per-map results into one AggregateResult per genome
+        totals = [[0.0, 0, 0] for _ in inst_sets]  # total fitness, treasures found, maps solved
+        for result in self.iter_results(inst_sets):
+            total = totals[result.genome]
+            total[0] += result.fit_index
+            total[1] += result.treasures_found
+            total[2] += result.solved
+        num_maps = len(self.maps)
+        return [AggregateResult(genome, num_maps, total, total / num_maps if num_maps else 0.0, treasures, solved)
+                for genome, (total, treasures, solved) in enumerate(totals)]
+
+    def write_table(self, inst_sets, file, aggregate=False):
+        # Write the results as CSV, per-map rows are written (and flushed) while the work units complete
+        writer = csv.writer(file)
+        if aggregate:
+            writer.writerow(AggregateResult._fields)
+            writer.writerows(self.aggregate(inst_sets))
+        else:
+            writer.writerow(MapResult._fields)
+            for result in self.iter_results(inst_sets):
+                writer.writerow(result)
+                if result.genome % self.chunk_size == 0:
+                    file.flush()
+        file.flush()
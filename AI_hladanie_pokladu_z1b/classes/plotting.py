@@ -0,0 +1,37 @@
+class FitnessPlotSink:
+    # Telemetry sink that plots the best fitness per generation when the run finishes
+    # matplotlib is imported only at that point, so headless runs never pay for it
+
+    def __init__(self, show=True, output_path=None):
+        self.show = show  # Open a window with the plot
+        self.output_path = output_path  # Optionally save the plot to a file
+        self.fitness = []  # Best fitness of every generation
+        self.distractions = []  # (generation, best fitness) of every distraction
+
+    def __call__(self, event):
+        if event['event'] == 'generation':
+            self.fitness.append(event['best_fitness'])
+        elif event['event'] == 'distraction':
+            self.distractions.append((event['generation'], event['best_fitness']))
+        elif event['event'] == 'finish':
+            self.plot()
+
+    def plot(self):
+        if self.output_path is not None and not self.show:
+            import matplotlib
+            matplotlib.use("Agg")  # No display is needed to save the plot
+        import matplotlib.pyplot as plt
+
+        for generation, best_fitness in self.distractions:
+            plt.annotate('distraction', xy=(generation, best_fitness), xytext=(generation + 5, best_fitness + 1),
+                         arrowprops=dict(facecolor='red', shrink=0.05))
+        # Plot the evolution of fitness over generations
+        plt.plot(self.fitness, marker='o', linestyle='-', color='b')
+        plt.title('Fitness Function Evolution Over Generations')
+        plt.xlabel('Generation')
+        plt.ylabel('Best Fitness')
+        plt.grid(True)
+        if self.output_path is not None:
+            plt.savefig(self.output_path)
+        if self.show:
+            plt.show()
@@ -1,13 +1,22 @@
 import random
 from classes.agent import Agent  # Importing the Agent class to create and manage agents
+from classes.selection import Ranking  # Ranking shared by elitism and tournament selection
 
 class Population():
     
-    def __init__(self):
+    def __init__(self, num_elite=1, tournament_size=2, crossover_rate=0.1, crossover_identical_rate=0.5,
+                 random_crossover_rate=0.7, random_crossover_identical_rate=0.9):
         self.generation = []  # List to store the current generation of agents
         self.num_agents = 0  # Number of agents in the current generation
         self.fitness_history = []  # To track fitness progression across generations
         self.first_i = 0  # This could be used as a starting index for future implementations
+        self.num_elite = num_elite  # Number of elite agents carried over to the next generation unchanged
+        self.tournament_size = tournament_size  # Number of contestants in every parent tournament
+        # Mutation rates of the children (a separate rate is used when both parents are the same agent)
+        self.crossover_rate = crossover_rate
+        self.crossover_identical_rate = crossover_identical_rate
+        self.random_crossover_rate = random_crossover_rate
+        self.random_crossover_identical_rate = random_crossover_identical_rate
 
     def __getitem__(self, index):
         # Enables indexing into the Population object directly, e.g., population[index]
@@ -18,28 +27,31 @@ class Population():
         self.generation.append(agent)
         self.num_agents += 1
 
-    def create_new_generation(self, distaction):
-        # Sort the generation based on the fitness index, highest fit agents come first
-        self.generation = sorted(self.generation, key=lambda obj: obj.fit_index, reverse=True)
-        new_generation = []  # New list to store agents for the next generation
+    def rank(self):
+        # Rank the current generation once, the ranking can be passed on to create_new_generation
+        return Ranking.from_agents(self.generation)
 
-        if not distaction:
-            # If distaction is not applied, we apply standard elitism and crossover
-            num_elite = round(1)  # Number of elite agents to carry over to the next generation (1 in this case)
-            
-            # Retain the elite agents (top performers)
-            for i in range(num_elite):
-                new_generation.append(Agent(self.generation[i].inst_set))
+    def create_new_generation(self, distaction, ranking=None):
+        # Reuse the ranking of the generation loop, or rank the generation now (no full sort is needed)
+        if ranking is None:
+            ranking = self.rank()
+        new_generation = []  # New list to store agents for the next generation
 
-            new_generation_length = len(new_generation)
+        # Retain the elite agents (top performers), found by partial selection
+        for i in ranking.top(self.num_elite):
+            new_generation.append(Agent(self.generation[i].inst_set))
 
-            # Fill the rest of the new generation with offspring from crossover
-            for i in range((self.num_agents - new_generation_length) // 2):
-                random_fx = random.sample(self.generation, 4)  # Randomly select 4 agents for the tournament
+        # Every pair of parents produces two children, enough pairs to refill the whole population
+        num_pairs = -(-(self.num_agents - len(new_generation)) // 2)
 
+        if not distaction:
+            # If distaction is not applied, we apply standard elitism and crossover
+            # Draw the contestants of all tournaments up front (two tournaments per pair of parents)
+            size = self.tournament_size
+            for contestants in ranking.draw_contestants(num_pairs, 2 * size):
                 # Perform two tournaments and select the two best parents
-                parent1 = self.tournament(random_fx[0], random_fx[1])
-                parent2 = self.tournament(random_fx[2], random_fx[3])
+                parent1 = self.generation[ranking.tournament(contestants[:size])]
+                parent2 = self.generation[ranking.tournament(contestants[size:])]
 
                 # Perform crossover to generate two children
                 childs = self.crossover(parent1, parent2)
@@ -49,16 +61,13 @@ class Population():
                 new_generation.append(childs[1])
         else:
             # If distaction is applied, we use a different crossover mechanism
-            num_elite = round(1)  # Keep one elite agent as before
-            for i in range(num_elite):
-                new_generation.append(Agent(self.generation[i].inst_set))
-
-            new_generation_length = len(new_generation)
+            random_parents = [random.randint(0, len(self.generation) - 1) for _ in range(num_pairs)]  # Random parents
+            best_of_three = ranking.draw_contestants(num_pairs, 3)  # Best of 3 tournaments
 
             # Fill the rest of the generation with offspring using the random crossover method
-            for i in range((self.num_agents - new_generation_length) // 2):
-                parent1 = self.generation[random.randint(0, self.num_agents - 1)]  # Random parent
-                parent2 = max(random.sample(self.generation, 3), key=lambda agent: agent.fit_index)  # Best of 3
+            for parent_index, contestants in zip(random_parents, best_of_three):
+                parent1 = self.generation[parent_index]
+                parent2 = self.generation[ranking.tournament(contestants)]
 
                 # Perform random crossover
                 childs = self.random_crossover(parent1, parent2)
@@ -67,8 +76,8 @@ class Population():
                 new_generation.append(childs[0])
                 new_generation.append(childs[1])
 
-        # Update the current generation with the new generation
-        self.generation = new_generation
+        # Update the current generation with the new generation (the second child of the last pair may not fit)
+        self.generation = new_generation[:self.num_agents]
 
     def crossover(self, parent1, parent2):
         # Perform crossover between two parents
@@ -86,7 +95,7 @@ class Population():
             child2 = parent2.inst_set[:parse_point] + parent1.inst_set[parse_point:]
 
         # Set mutation rate based on the similarity of parents
-        mutation_rate = 0.5 if parent1 == parent2 else 0.1  # Higher mutation if parents are identical
+        mutation_rate = self.crossover_identical_rate if parent1 == parent2 else self.crossover_rate  # Higher mutation if parents are identical
 
         # Return two new agents with the crossover result, applying mutation
         return Agent(child1).mutate(mutation_rate), Agent(child2).mutate(mutation_rate)
@@ -100,16 +109,8 @@ class Population():
         child2 = parent2.inst_set[parse_point:] + parent1.inst_set[:parse_point]
 
         # Set a higher mutation rate for random crossover
-        mutation_rate = 0.9 if parent1 == parent2 else 0.7
+        mutation_rate = self.random_crossover_identical_rate if parent1 == parent2 else self.random_crossover_rate
 
         # Return two new agents with mutation applied
         return Agent(child1).mutate(mutation_rate), Agent(child2).mutate(mutation_rate)
 
-    def tournament(self, parent1, parent2):
-        # Perform a tournament selection between two parents
-        if parent1 == parent2:
-            return random.choice([parent1, parent2])  # If identical, randomly choose one
-        if parent1.fit_index > parent2.fit_index:
-            return parent1  # Return the better-fit parent
-        else:
-            return parent2  # Return the better-fit parent
@@ -0,0 +1,170 @@
+import math  # Entropy of the gene values
+import random  # Distraction durations (the global generator seeded by Evolution)
+from collections import Counter, namedtuple  # Gene value counts, statistics and decisions
+
+# Search state seen by a policy after every evaluated generation
+# plateau is the number of generations since the best fitness last improved, unique_ratio the share of distinct
+# genomes and entropy the mean per-locus entropy of the gene values (0 = all agents equal, 1 = uniform)
+# (unique_ratio and entropy are None for policies that do not use them)
+GenerationStats = namedtuple('GenerationStats', ['generation', 'best_fitness', 'plateau', 'unique_ratio', 'entropy'])
+
+# What the next generation looks like: distraction (random crossover) or not, the factor applied to the mutation
+# rates of the population, and the reason of a changed decision (None when nothing changed, nothing is logged)
+Decision = namedtuple('Decision', ['distract', 'mutation_scale', 'reason'])
+
+def genome_diversity(genomes):
+    # (share of distinct genomes, mean per-locus entropy normalized to 0..1) of a list of instruction sets
+    genomes = [bytes(genome) for genome in genomes]
+    if not genomes:
+        return 0.0, 0.0
+    unique_ratio = len(set(genomes)) / len(genomes)
+    maximum = math.log2(min(len(genomes), 256))  # Highest entropy reachable with this many agents
+    if maximum == 0:
+        return unique_ratio, 0.0
+    total = 0.0
+    loci = 0
+    for values in zip(*genomes):
+        counts = Counter(values)
+        total -= sum(count * math.log2(count / len(values)) for count in counts.values()) / len(values)
+        loci += 1
+    return unique_ratio, total / (loci * maximum) if loci else 0.0
+
+class FixedCadencePolicy:
+    # Original schedule of setup.py: the first distraction at generation 'first_distraction', later ones every
+    # 'distraction_frequency' generations, each lasting a random number of generations in 'distraction_duration'
+    uses_diversity = False
+
+    def __init__(self, first_distraction=200, distraction_frequency=500, distraction_duration=(20, 40)):
+        self.distraction_frequency = distraction_frequency
+        self.distraction_duration = distraction_duration
+        self.frequency = first_distraction  # Current distraction interval
+        self.distractor = 0  # Remaining generations of the current distraction
+
+    def decide(self, stats):
+        i = stats.generation
+        if i % self.frequency == 0 and i != 0:
+            return Decision(True, 1.0, 'cadence')
+        if self.distractor > 0:
+            return Decision(True, 1.0, None)
+        return Decision(False, 1.0, None)
+
+    def applied(self, decision, stats):
+        # Called after the new generation was created, returns the event to log (or None)
+        # The duration is drawn after the reproduction, as in the original loop (same random sequence)
+        if decision.reason == 'cadence':
+            self.frequency = self.distraction_frequency  # Increase the frequency interval after the first distraction
+            self.distractor = random.randint(*self.distraction_duration)  # Number of generations to apply distractions
+            return {'event': 'distraction', 'generation': stats.generation, 'best_fitness': stats.best_fitness,
+                    'duration': self.distractor}
+        if decision.distract:
+            self.distractor -= 1
+        return None
+
+    def state(self):
+        return {'frequency': self.frequency, 'distractor': self.distractor}
+
+    def restore(self, state):
+        self.frequency = state['frequency']
+        self.distractor = state['distractor']
+
+class AdaptivePolicy:
+    # Reacts to stagnation instead of a fixed cadence:
+    # - after 'patience' generations without improvement, a converged population (less than 'min_unique' distinct
+    #   genomes or a mean entropy below 'min_entropy') gets a distraction of a random length in 'distraction_duration'
+    # - a stalled but still diverse population first gets its mutation rates scaled up by 'scale_step' (every
+    #   'patience' generations), once the factor reached 'max_scale' it gets a distraction as well
+    # - every improvement scales the mutation rates back down by one step
+    # - after a distraction or a mutation change, the next decision waits at least 'patience' generations
+    uses_diversity = True
+
+    def __init__(self, patience=80, min_unique=0.6, min_entropy=0.5, distraction_duration=(20, 40),
+                 scale_step=1.5, max_scale=2.25):
+        self.patience = patience
+        self.min_unique = min_unique
+        self.min_entropy = min_entropy
+        self.distraction_duration = distraction_duration
+        self.scale_step = scale_step
+        self.max_scale = max_scale
+        self.distractor = 0  # Remaining generations of the current distraction
+        self.scale = 1.0  # Current mutation rate factor
+        self.quiet_since = 0  # Generation of the last distraction end or mutation change
+
+    def decide(self, stats):
+        if self.distractor > 0:
+            return Decision(True, self.scale, None)
+        if stats.plateau == 0 and self.scale > 1.0:
+            self.scale = max(1.0, self.scale / self.scale_step)
+            return Decision(False, self.scale, 'improving')
+        if stats.plateau >= self.patience and stats.generation - self.quiet_since >= self.patience:
+            self.quiet_since = stats.generation
+            if stats.unique_ratio < self.min_unique or stats.entropy < self.min_entropy:
+                self.scale = 1.0
+                return Decision(True, self.scale, 'converged')
+            if self.scale >= self.max_scale:
+                self.scale = 1.0
+                return Decision(True, self.scale, 'exhausted')
+            self.scale = min(self.max_scale, self.scale * self.scale_step)
+            return Decision(False, self.scale, 'stalled')
+        return Decision(False, self.scale, None)
+
+    def applied(self, decision, stats):
+        if decision.reason in ('converged', 'exhausted'):
+            self.distractor = random.randint(*self.distraction_duration)
+            return {'event': 'distraction', 'generation': stats.generation, 'best_fitness': stats.best_fitness,
+                    'duration': self.distractor}
+        if decision.distract:
+            self.distractor -= 1
+            if self.distractor == 0:
+                self.quiet_since = stats.generation
+        return None
+
+    def state(self):
+        return {'distractor': self.distractor, 'scale': self.scale, 'quiet_since': self.quiet_since}
+
+    def restore(self, state):
+        self.distractor = state['distractor']
+        self.scale = state['scale']
+        self.quiet_since = state['quiet_since']
+
+POLICIES = {'fixed': FixedCadencePolicy, 'adaptive': AdaptivePolicy}
+
+class Scheduler:
+    def __init__(self, policy):
+        # Tracks the plateau length (and the diversity, when the policy uses it) and asks the policy
+        # how to create every next generation
+        self.policy = policy
+        self.best_fitness = None  # Best fitness seen so far
+        self.plateau = 0
+        self.stats = None  # Statistics of the last evaluated generation
+        self.decision = None  # Decision for the generation being created
+
+    def observe(self, generation, best_fitness, agents):
+        if self.best_fitness is None or best_fitness > self.best_fitness:
+            self.best_fitness = best_fitness
+            self.plateau = 0
+        else:
+            self.plateau += 1
+        unique_ratio = entropy = None
+        if self.policy.uses_diversity:
+            unique_ratio, entropy = genome_diversity(agent.inst_set for agent in agents)
+        self.stats = GenerationStats(generation, best_fitness, self.plateau, unique_ratio, entropy)
+        return self.stats
+
+    def decide(self):
+        self.decision = self.policy.decide(self.stats)
+        return self.decision
+
+    def applied(self):
+        return self.policy.applied(self.decision, self.stats)
+
+    def state(self):
+        # The statistics of the last evaluated generation are kept, a checkpoint is taken before its reproduction
+        stats = list(self.stats) if self.stats is not None else None
+        return {'best_fitness': self.best_fitness, 'plateau': self.plateau, 'stats': stats, 'policy': self.policy.state()}
+
+    def restore(self, state):
+        self.best_fitness = state['best_fitness']
+        self.plateau = state['plateau']
+        stats = state.get('stats')
+        self.stats = GenerationStats(*stats) if stats is not None else None
+        self.policy.restore(state['policy'])
@@ -0,0 +1,47 @@
+import heapq  # Partial selection of the best agents without sorting the whole generation
+import random  # Random contestants for the tournaments
+
+class Ranking:
+    # Fitness ranking of one generation, computed once and shared by the generation loop
+    # (best agent, fitness history) and Population.create_new_generation (elites, tournaments)
+
+    def __init__(self, fitness):
+        self.fitness = fitness  # Fitness of every agent, indexed like the generation
+        self.size = len(fitness)  # Number of ranked agents
+        self._best = None  # Index of the best agent, computed on first use
+        self._top = {}  # Cached results of top(k)
+
+    @classmethod
+    def from_agents(cls, agents):
+        return cls([agent.fit_index for agent in agents])
+
+    def best(self):
+        # Index of the first agent with the highest fitness (same agent a stable descending sort puts first)
+        if self._best is None:
+            self._best = max(range(self.size), key=self.fitness.__getitem__)
+        return self._best
+
+    def top(self, k):
+        # Indices of the k best agents in descending fitness order, found with a heap in O(n log k)
+        if k not in self._top:
+            if k == 1:
+                self._top[k] = [self.best()]
+            else:
+                self._top[k] = heapq.nlargest(k, range(self.size), key=self.fitness.__getitem__)
+        return self._top[k]
+
+    def draw_contestants(self, count, size):
+        # Draw the contestants of 'count' tournament rounds before any round is played, each round has 'size'
+        # distinct agents (one random.sample per round, the random sequence of the original selection loop)
+        population = range(self.size)
+        return [random.sample(population, size) for _ in range(count)]
+
+    def tournament(self, contestants):
+        # Index of the tournament winner, on equal fitness the later contestant wins (like the original pairwise
+        # tournament of Population)
+        fitness = self.fitness
+        winner = contestants[0]
+        for contestant in contestants[1:]:
+            if not fitness[winner] > fitness[contestant]:
+                winner = contestant
+        return winner
@@ -0,0 +1,210 @@
+import itertools  # Cartesian product of a grid search space
+import json  # Results file (JSON lines) and stable trial keys
+import math  # Number of trials kept by successive halving
+import os  # Checkpoint paths and the default number of workers
+import random  # Sampling of a random search space
+import statistics  # Median generations to solution in the report
+import time  # Wall time of every trial
+from collections import namedtuple  # Trials and their results
+from classes.checkpoint import save_checkpoint  # Paused trials are continued from a checkpoint
+from classes.evolution import Evolution  # Runner executing one trial
+
+# Evolution parameters a search space may contain
+SWEEP_PARAMETERS = ('num_agents', 'num_instructions', 'first_distraction', 'distraction_frequency',
+                    'distraction_duration', 'crossover_rate', 'crossover_identical_rate', 'random_crossover_rate',
+                    'random_crossover_identical_rate')
+
+# One configuration run with one seed
+Trial = namedtuple('Trial', ['index', 'config', 'seed', 'key'])
+
+# Terminal states of a trial ('paused' trials continue at the next rung)
+FINAL_STATUSES = ('solved', 'finished', 'pruned')
+
+def _check_space(space):
+    unknown = set(space) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+def _normalize(value):
+    # JSON turns tuples into lists, the distraction range is always used as a tuple
+    return tuple(value) if isinstance(value, list) else value
+
+def grid_space(space):
+    # Every combination of the listed values, e.g. {'num_agents': [101, 201], 'crossover_rate': [0.05, 0.1]}
+    _check_space(space)
+    names = sorted(space)
+    return [{name: _normalize(value) for name, value in zip(names, values)}
+            for values in itertools.product(*(space[name] for name in names))]
+
+def random_space(space, num_configs, seed=0):
+    # 'num_configs' random configurations: a list is sampled with random.choice, a pair (low, high) is sampled
+    # uniformly (random.randint if both bounds are integers), e.g. {'crossover_rate': (0.01, 0.3), 'num_agents': [101, 201]}
+    _check_space(space)
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(num_configs):
+        config = {}
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, list):
+                config[name] = _normalize(rng.choice(values))
+            elif isinstance(values[0], int) and isinstance(values[1], int):
+                config[name] = rng.randint(values[0], values[1])
+            else:
+                config[name] = rng.uniform(values[0], values[1])
+        configs.append(config)
+    return configs
+
+def make_trials(configs, seeds=(0,)):
+    # One trial per configuration and seed, the key identifies the trial when a sweep is resumed
+    trials = []
+    for config in configs:
+        for seed in seeds:
+            key = json.dumps({'config': config, 'seed': seed}, sort_keys=True)
+            trials.append(Trial(len(trials), config, seed, key))
+    return trials
+
+def _run_trial(game_map, trial, generations, stop_at, checkpoint, checkpoint_path):
+    # Run (or continue) one trial until it is solved, reaches 'generations' or reaches generation 'stop_at'
+    # A trial stopped at 'stop_at' (after evaluating 'stop_at' generations) is saved to checkpoint_path with its
+    # evaluated fitness and can be continued exactly from there
+    started = time.perf_counter()
+    evolution = Evolution(game_map, generations=generations, seed=trial.seed, workers=1, **trial.config)
+    evolution.start(checkpoint)
+    status = None
+    try:
+        if checkpoint is not None:
+            evolution.reproduce()  # The checkpoint holds an evaluated generation
+        while True:
+            if evolution.evaluate() is not None:
+                status = 'solved'
+                break
+            if evolution.generation >= generations - 1:
+                status = 'finished'
+                break
+            if evolution.generation >= stop_at - 1:
+                save_checkpoint(checkpoint_path, evolution.snapshot())
+                status = 'paused'
+                break
+            evolution.reproduce()
+    finally:
+        evolution.evaluator.close()
+    best = evolution.best_agent
+    return {'generation': evolution.generation, 'status': status, 'best_fitness': best.fit_index,
+            'treasures_found': best.treasures_found,
+            'generations_to_solution': evolution.generation if status == 'solved' else None,
+            'checkpoint': checkpoint_path if status == 'paused' else None,
+            'wall_time': time.perf_counter() - started}
+
+class Sweep:
+    def __init__(self, game_map, trials, results_path, checkpoint_dir, generations=2000, min_generations=None,
+                 eta=3, workers=None):
+        # Runs every trial on a process pool, records every state change in 'results_path' (JSON lines)
+        # Successive halving: with min_generations, all trials run min_generations generations, then only the best
+        # 1/eta of the unsolved trials (by best fitness) continue for eta times as many generations, and so on
+        # A sweep with an existing results file continues where it stopped
+        self.game_map = game_map
+        self.trials = list(trials)
+        self.results_path = results_path
+        self.checkpoint_dir = checkpoint_dir
+        self.generations = generations
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.rungs = []  # Generation at which every rung ends
+        rung = min_generations or generations
+        while rung < generations:
+            self.rungs.append(rung)
+            rung *= eta
+        self.rungs.append(generations)
+        self.eta = eta
+        self.states = {}  # Trial index -> last record of the trial
+
+    def load_results(self):
+        # Latest record of every trial of this sweep found in the results file
+        if not os.path.exists(self.results_path):
+            return
+        indices = {trial.key: trial.index for trial in self.trials}
+        with open(self.results_path, "r") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['key'] in indices:
+                    self.states[indices[record['key']]] = record
+
+    def record(self, trial, rung, result, previous=None):
+        # Append a record of the trial state, the wall time accumulates over the rungs
+        record = dict(result)
+        record.update({'trial': trial.index, 'key': trial.key, 'config': trial.config, 'seed': trial.seed, 'rung': rung})
+        if previous is not None:
+            record['wall_time'] += previous['wall_time']
+        with open(self.results_path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        self.states[trial.index] = record
+        if previous is not None and previous.get('checkpoint') and previous['checkpoint'] != record.get('checkpoint'):
+            if os.path.exists(previous['checkpoint']):
+                os.remove(previous['checkpoint'])  # The trial continued, its older checkpoint is not needed anymore
+
+    def alive(self):
+        return [trial for trial in self.trials
+                if trial.index not in self.states or self.states[trial.index]['status'] not in FINAL_STATUSES]
+
+    def run_rung(self, rung):
+        # Bring every trial that is still running to the end of the rung
+        stop_at = self.rungs[rung]
+        pending = [trial for trial in self.alive()
+                   if trial.index not in self.states or self.states[trial.index]['rung'] < rung]
+        jobs = []
+        for trial in pending:
+            previous = self.states.get(trial.index)
+            path = os.path.join(self.checkpoint_dir, f"trial_{trial.index:04d}_rung_{rung}.tsc")
+            jobs.append((trial, previous, (self.game_map, trial, self.generations, stop_at,
+                                           previous['checkpoint'] if previous else None, path)))
+        if self.workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                futures = {pool.submit(_run_trial, *arguments): (trial, previous) for trial, previous, arguments in jobs}
+                for future in as_completed(futures):
+                    trial, previous = futures[future]
+                    self.record(trial, rung, future.result(), previous)
+        else:
+            for trial, previous, arguments in jobs:
+                self.record(trial, rung, _run_trial(*arguments), previous)
+
+    def halve(self, rung):
+        # Stop all but the best 1/eta of the trials paused at this rung (ties are kept in trial order)
+        # Trials already pruned at this rung are counted too, so a resumed sweep prunes the same trials
+        paused = [trial for trial in self.trials if trial.index in self.states
+                  and self.states[trial.index]['rung'] == rung and self.states[trial.index]['status'] in ('paused', 'pruned')]
+        keep = math.ceil(len(paused) / self.eta)
+        paused.sort(key=lambda trial: (-self.states[trial.index]['best_fitness'], trial.index))
+        for trial in paused[keep:]:
+            if self.states[trial.index]['status'] == 'pruned':
+                continue
+            previous = self.states[trial.index]
+            result = dict(previous, status='pruned', checkpoint=None, wall_time=0.0)
+            self.record(trial, rung, result, previous)
+
+    def run(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        self.load_results()
+        for rung in range(len(self.rungs)):
+            self.run_rung(rung)
+            if rung < len(self.rungs) - 1 and not any(self.states[trial.index]['rung'] > rung
+                                                      for trial in self.trials if trial.index in self.states):
+                self.halve(rung)
+        return [self.states[trial.index] for trial in self.trials]
+
+    def report(self):
+        # One line per configuration: solved seeds, median generations to solution, best fitness and wall time
+        configs = {}
+        for trial in self.trials:
+            key = json.dumps(trial.config, sort_keys=True)
+            configs.setdefault(key, []).append(self.states[trial.index])
+        lines = []
+        for key, records in configs.items():
+            solved = [record['generations_to_solution'] for record in records if record['status'] == 'solved']
+            median = f"{statistics.median(solved):.0f}" if solved else "-"
+            lines.append(f"{key}: solved {len(solved)}/{len(records)}, median generations {median}, "
+                         f"best fitness {max(record['best_fitness'] for record in records):.2f}, "
+                         f"wall time {sum(record['wall_time'] for record in records):.1f}s")
+        return "\n".join(lines)
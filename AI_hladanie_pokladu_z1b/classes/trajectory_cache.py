@@ -0,0 +1,151 @@
+from classes.environment import SparseEnvironment, OutOfBound  # Map representation and the out-of-bounds signal
+
+# Position change of every move (same moves as Environment.move_agent, unknown moves stay in place)
+MOVE_DELTAS = {'H': (0, -1), 'D': (0, 1), 'P': (1, 0), 'L': (-1, 0)}
+
+class TrieNode:
+    # Walk state after a trajectory prefix: position, collected treasures and steps taken
+    # A terminal node ended the walk (out of bounds, or all treasures found), longer prefixes score the same
+    __slots__ = ('children', 'x', 'y', 'mask', 'treasures', 'steps', 'out_of_bound', 'terminal', 'tick')
+
+    def __init__(self, x, y, mask, treasures, steps, out_of_bound, terminal, tick):
+        self.children = {}  # Move -> TrieNode
+        self.x = x
+        self.y = y
+        self.mask = mask  # Bit i is set when treasure i of the sparse index was collected
+        self.treasures = treasures  # Number of collected treasures
+        self.steps = steps  # Steps counted by the fitness function (the move leaving the map is not counted)
+        self.out_of_bound = out_of_bound
+        self.terminal = terminal
+        self.tick = tick  # Last walk that passed through this node (ancestors are never older than descendants)
+
+class TrajectoryTrie:
+    def __init__(self, size, start_location, treasure_index, num_treasures, capacity=200000):
+        # Bounded trie over move strings of one map, scoring a trajectory only simulates the moves
+        # after its longest prefix already in the trie
+        # treasure_index maps a treasure location to its bit in the collected mask (SparseEnvironment.treasure_index)
+        if capacity <= 0:
+            raise ValueError("Trie capacity must be positive")
+        self.size = size
+        self.treasure_index = treasure_index
+        self.num_treasures = num_treasures
+        self.capacity = capacity  # Maximum number of nodes (the root is not counted)
+        self.nodes = 0
+        self.tick = 0
+        self.reused = 0  # Moves answered from existing nodes
+        self.simulated = 0  # Moves that created a new node
+        self.evictions = 0  # Nodes dropped by pruning
+        self.root = self.make_node(start_location[0], start_location[1], 0, 0, 0)
+
+    def __len__(self):
+        return self.nodes
+
+    def make_node(self, x, y, mask, treasures, steps):
+        # State after moving to (x, y) with the given counters before checking the new position
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return TrieNode(x, y, mask, treasures, steps - 1 if steps else 0, True, True, self.tick)
+        index = self.treasure_index.get((x, y))
+        if index is not None and not mask >> index & 1:
+            mask |= 1 << index
+            treasures += 1
+        return TrieNode(x, y, mask, treasures, steps, False, treasures == self.num_treasures, self.tick)
+
+    def walk(self, cmd_set):
+        # Returns the node of the last move that counts for the fitness function
+        self.tick += 1
+        tick = self.tick
+        node = self.root
+        node.tick = tick
+        created = 0
+        moves = 0
+        for move in cmd_set:
+            if node.terminal:
+                break  # Out of bounds or all treasures found, the rest of the trajectory is ignored
+            moves += 1
+            child = node.children.get(move)
+            if child is None:
+                dx, dy = MOVE_DELTAS.get(move, (0, 0))
+                child = self.make_node(node.x + dx, node.y + dy, node.mask, node.treasures, node.steps + 1)
+                node.children[move] = child
+                created += 1
+            else:
+                child.tick = tick
+            node = child
+        self.simulated += created
+        self.reused += moves - created
+        self.nodes += created
+        if self.nodes > self.capacity:
+            self.prune()
+        return node
+
+    def prune(self):
+        # Drop every subtree last used before the median tick (at least the oldest subtree is dropped)
+        ticks = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for child in node.children.values():
+                ticks.append(child.tick)
+                stack.append(child)
+        ticks.sort()
+        threshold = max(ticks[len(ticks) // 2], ticks[0] + 1)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for move, child in list(node.children.items()):
+                if child.tick < threshold:
+                    removed = self.count(child)
+                    del node.children[move]
+                    self.nodes -= removed
+                    self.evictions += removed
+                else:
+                    stack.append(child)
+
+    @staticmethod
+    def count(node):
+        # Number of nodes of a subtree
+        total = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            total += 1
+            stack.extend(node.children.values())
+        return total
+
+    def clear(self):
+        self.root.children.clear()
+        self.nodes = 0
+
+    def stats(self):
+        # Summary of the trie counters
+        moves = self.reused + self.simulated
+        return {
+            'nodes': self.nodes,
+            'capacity': self.capacity,
+            'reused_moves': self.reused,
+            'simulated_moves': self.simulated,
+            'evictions': self.evictions,
+            'reuse_rate': self.reused / moves if moves else 0.0,
+        }
+
+class TrieEnvironment(SparseEnvironment):
+    # SparseEnvironment scoring command sets through a TrajectoryTrie, the results (including the
+    # all-treasures early stop and the out-of-bounds penalty applied by evaluate_agent) are unchanged
+
+    def __init__(self, size, start_location, treasure_locations, capacity=200000):
+        super().__init__(size, start_location, treasure_locations)
+        self.trie = TrajectoryTrie(size, self.start_location, self.treasure_index, self.num_treasures, capacity)
+
+    def fitness_function(self, agent):
+        node = self.trie.walk(agent.cmd_set)
+        agent.steps = node.steps
+        agent.treasures_found = node.treasures
+        if node.out_of_bound:
+            raise OutOfBound(agent)  # evaluate_agent applies the penalty with the steps before leaving the map
+
+        # Calculate fitness based on treasures found and steps taken
+        if agent.steps == 0:
+            agent.fit_index = 0  # No steps taken, fitness is 0
+        else:
+            agent.fit_index = agent.treasures_found + 0.1 - (agent.steps / 100)  # Fitness formula
+        return agent.treasures_found == self.num_treasures
@@ -0,0 +1,50 @@
+from classes.map_loader import load_map_directory  # Import the directory loader (maps are parsed without eval)
+from classes.map_runner import MapRunner, genomes_from_checkpoint  # Import the multi-map runner
+import argparse  # Command line options
+import os  # Default number of worker processes
+import random  # Random genomes when no checkpoint is given
+import sys  # Results are streamed to stdout by default
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a set of genomes on every map of a directory")
+    parser.add_argument('maps', help="Directory with map files")
+    parser.add_argument('--pattern', default="*.txt", help="File name pattern of the map files")
+    parser.add_argument('--checkpoint', metavar='PATH', help="Evaluate the population saved in a checkpoint file")
+    parser.add_argument('--top', type=int, default=None, help="Only evaluate the best TOP genomes of the checkpoint")
+    parser.add_argument('--random', type=int, default=201, metavar='N', help="Without --checkpoint, evaluate N random genomes")
+    parser.add_argument('--instructions', type=int, default=30, help="Instructions per random genome")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of the random genomes")
+    parser.add_argument('--aggregate', action='store_true', help="One row per genome with the fitness summed over all maps")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--backend', choices=('string', 'bytes'), default='bytes', help="Virtual machine backend")
+    parser.add_argument('--trajectory-cache', type=int, default=100000, metavar='GENOMES',
+                        help="Genomes whose trajectory every process reuses on the other maps (0 disables it)")
+    parser.add_argument('--chunk-size', type=int, default=256, help="Genomes per work unit")
+    parser.add_argument('--output', default='-', metavar='PATH', help="CSV results table ('-' for stdout)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    maps = load_map_directory(args.maps, args.pattern)
+    if not maps:
+        print(f"No maps matching {args.pattern} in {args.maps}.", file=sys.stderr)
+        return 1
+    if args.checkpoint:
+        genomes = genomes_from_checkpoint(args.checkpoint, args.top)
+    else:
+        rng = random.Random(args.seed)
+        genomes = [bytes(rng.randint(0, 255) for _ in range(args.instructions)) for _ in range(args.random)]
+
+    output = sys.stdout if args.output == '-' else open(args.output, "w", newline="")
+    try:
+        with MapRunner(maps, workers=args.workers, chunk_size=args.chunk_size, backend=args.backend,
+                       trajectory_capacity=args.trajectory_cache) as runner:
+            runner.write_table(genomes, output, aggregate=args.aggregate)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+# The guard keeps worker processes (which re-import this module) from running the evaluation
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+from classes.map_loader import load_map  # Import the map parser (reads the input file without eval)
+from classes.sweep import Sweep, grid_space, make_trials, random_space  # Import the sweep engine
+import argparse  # Command line options
+import json  # Search space file
+import os  # Default number of worker processes
+import sys  # Exit code
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Run a hyperparameter and seed sweep of the evolutionary search")
+    parser.add_argument('space', help="JSON file with the search space, either {\"grid\": {name: [values]}} or "
+                                      "{\"random\": {name: [choices] or {\"low\": a, \"high\": b}}, \"configs\": N}")
+    parser.add_argument('--map', default="resources/input.txt", help="Map file")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help="Seeds every configuration is run with")
+    parser.add_argument('--generations', type=int, default=2000, help="Maximum number of generations per trial")
+    parser.add_argument('--min-generations', type=int, default=None,
+                        help="Generations of the first successive halving rung (default: no early stopping)")
+    parser.add_argument('--eta', type=int, default=3, help="Successive halving keeps the best 1/ETA trials per rung")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Trials run concurrently")
+    parser.add_argument('--results', default="sweep.jsonl", metavar='PATH',
+                        help="Results file (JSON lines), an existing file resumes the sweep")
+    parser.add_argument('--checkpoint-dir', default="sweep_checkpoints", metavar='DIR', help="Checkpoints of paused trials")
+    return parser.parse_args(argv)
+
+def load_space(path):
+    with open(path, "r") as file:
+        spec = json.load(file)
+    if 'grid' in spec:
+        return grid_space(spec['grid'])
+    space = {name: (values['low'], values['high']) if isinstance(values, dict) else values
+             for name, values in spec['random'].items()}
+    return random_space(space, spec.get('configs', 10), spec.get('seed', 0))
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    try:
+        game_map = load_map(args.map)
+    except FileNotFoundError:
+        print(f"File {args.map} not found.")
+        return 1
+    trials = make_trials(load_space(args.space), args.seeds)
+    sweep = Sweep(game_map, trials, args.results, args.checkpoint_dir, generations=args.generations,
+                  min_generations=args.min_generations, eta=args.eta, workers=args.workers)
+    sweep.run()
+    print(sweep.report())
+    return 0
+
+# The guard keeps worker processes (which re-import this module) from running the sweep
+if __name__ == "__main__":
+    sys.exit(main())
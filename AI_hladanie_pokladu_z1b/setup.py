@@ -1,108 +1,143 @@
-from classes.environment import Environment, OutOfBound  # Import custom classes for environment and handling out-of-bound exceptions
-from classes.machine import Machine  # Import the Machine class for simulating instruction execution
-from classes.population import Population  # Import the Population class to manage agents in the simulation
-from classes.agent import Agent  # Import the Agent class which represents an individual in the population
-import random  # Import random for generating random instruction sets for agents
-import matplotlib.pyplot as plt  # Import matplotlib for visualizing fitness progression
+from classes.evolution import Evolution, JsonLinesSink  # Import the evolution runner and the JSON lines telemetry sink
+from classes.map_loader import load_map  # Import the map parser (reads the input file without eval)
+import argparse  # Import argparse to read the simulation parameters from the command line
+import sys  # Import sys for the exit code
 
-# Input file containing environment configuration (size, start location, treasure locations)
-file_path = "resources/input.txt"
+def parse_arguments(argv=None):
+    # Simulation parameters (defaults are the values the simulation was tuned with)
+    parser = argparse.ArgumentParser(description="Evolutionary search for a path that collects all treasures")
+    parser.add_argument('--map', default="resources/input.txt", help="Map file (size, start location, treasure locations)")
+    parser.add_argument('--agents', type=int, default=201, help="Number of agents in the population")
+    parser.add_argument('--instructions', type=int, default=30, help="Number of instructions per agent")
+    parser.add_argument('--generations', type=int, default=2000, help="Maximum number of generations")
+    parser.add_argument('--first-distraction', type=int, default=200, help="Generation of the first distraction")
+    parser.add_argument('--distraction-frequency', type=int, default=500, help="Interval between later distractions")
+    parser.add_argument('--distraction-duration', type=int, nargs=2, default=(20, 40), metavar=('MIN', 'MAX'),
+                        help="Range of the number of generations a distraction lasts")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of the random generator")
+    parser.add_argument('--scheduler', choices=('fixed', 'adaptive'), default='fixed',
+                        help="Distraction schedule: fixed cadence, or adaptive to stagnation and genome diversity")
+    parser.add_argument('--mutation-rates', type=float, nargs=4, default=(0.1, 0.5, 0.7, 0.9),
+                        metavar=('CROSSOVER', 'IDENTICAL', 'RANDOM', 'RANDOM_IDENTICAL'),
+                        help="Mutation rates after crossover / random crossover (normal and identical parents)")
+    parser.add_argument('--backend', choices=('string', 'bytes'), default='bytes',
+                        help="Virtual machine backend ('string' is the original interpreter)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for the fitness evaluation (default: 1, serial; "
+                                                                         "pays off only for large populations)")
+    parser.add_argument('--cache-capacity', type=int, default=100000, help="Genomes kept in the fitness cache (0 disables it)")
+    parser.add_argument('--trajectory-cache', type=int, default=0, metavar='NODES',
+                        help="Score trajectories through a prefix trie of NODES nodes per process (0 disables it)")
+    parser.add_argument('--population', choices=('list', 'array'), default='list',
+                        help="Population type ('array' keeps the genomes in a NumPy matrix and reproduces them in batches)")
+    parser.add_argument('--batch-size', type=int, default=0, metavar='AGENTS',
+                        help="Run the machines of generations of at least AGENTS agents in lockstep with NumPy (0 disables it)")
+    parser.add_argument('--islands', type=int, default=1, help="Number of island populations (more than 1 runs the island model)")
+    parser.add_argument('--telemetry', metavar='PATH', help="Stream per-generation telemetry as JSON lines ('-' for stdout)")
+    parser.add_argument('--plot', action='store_true', help="Show the fitness plot at the end (needs matplotlib)")
+    parser.add_argument('--plot-file', metavar='PATH', help="Save the fitness plot to a file (needs matplotlib)")
+    parser.add_argument('--instrument', metavar='PATH', help="Write per-phase timers and counters per generation (.json or .csv), "
+                                                         "evaluates in this process (--workers 1)")
+    parser.add_argument('--profile', type=int, nargs=2, metavar=('FIRST', 'LAST'), help="Run cProfile for this range of generations")
+    parser.add_argument('--profile-file', default="evolution.prof", metavar='PATH', help="cProfile dump written for --profile")
+    parser.add_argument('--checkpoint-dir', metavar='DIR', help="Directory for periodic checkpoints")
+    parser.add_argument('--checkpoint-every', type=int, default=100, help="Generations between checkpoints")
+    parser.add_argument('--resume', metavar='PATH', help="Continue the run from a checkpoint file")
+    parser.add_argument('--quiet', action='store_true', help="Do not print the generation numbers")
+    args = parser.parse_args(argv)
+    if args.islands > 1:
+        # Every island evolves serially in its own process and only the final report is printed
+        unsupported = [option for option, value in (('--workers', args.workers), ('--telemetry', args.telemetry),
+                                                    ('--plot', args.plot), ('--plot-file', args.plot_file),
+                                                    ('--instrument', args.instrument), ('--profile', args.profile),
+                                                    ('--checkpoint-dir', args.checkpoint_dir), ('--resume', args.resume),
+                                                    ('--population array', args.population == 'array'))
+                       if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --islands")
+    return args
 
-# Initialize variables for environment settings and agent parameters
-def_environment_size = 0  # Default environment size, to be read from the input file
-start_location_xy = []  # Starting location coordinates (x, y), to be read from the input file
-treasure_locations_xy = []  # List to store treasure locations (x, y), read from input file
+def print_progress(event):
+    # Console output of the original simulation
+    if event['event'] == 'generation' and not event['solved']:
+        print(event['generation'])  # Print current generation number for tracking progress
+    elif event['event'] == 'distraction':
+        print("CC:", event['duration'])  # Number of generations the distraction lasts
+    elif event['event'] == 'schedule' and event['reason'] != 'cadence':
+        print("Scheduler:", event['reason'], "mutation x", event['mutation_scale'])  # Adaptive scheduler decision
 
-# Variables for managing population and evolutionary parameters
-distractor = 0  # Variable to manage random disturbances during evolution
-init_num_agents = 201  # Initial number of agents in the population
-init_num_instructions = 30  # Number of instructions per agent (instruction set length)
+def main(argv=None):
+    args = parse_arguments(argv)
+    try:
+        # Load environment configuration from input file (size, start location, treasure locations)
+        game_map = load_map(args.map)
+    except FileNotFoundError:
+        # Handle the case where the input file is not found
+        print(f"File {args.map} not found.")
+        return 1
 
-try:
-    # Load environment configuration from input file
-    with open(file_path, "r") as file:
-        def_environment_size = int(file.readline().strip())  # Read environment size (first line)
-        start_location_xy = eval(file.readline().strip())  # Read start location (second line)
-        for _ in range(int(file.readline().strip())):  # Read number of treasures
-            treasure_locations_xy.append(eval(file.readline().strip()))  # Append each treasure location
+    if args.islands > 1:
+        # Island model: independent populations exchanging their best agents every 50 generations
+        from classes.islands import IslandModel
+        islands = IslandModel(game_map, num_islands=args.islands, num_agents=args.agents,
+                              num_instructions=args.instructions, generations=args.generations, seed=args.seed,
+                              backend=args.backend, cache_capacity=args.cache_capacity,
+                              trajectory_nodes=args.trajectory_cache, batch_size=args.batch_size, scheduler=args.scheduler,
+                              first_distraction=args.first_distraction, distraction_frequency=args.distraction_frequency,
+                              distraction_duration=tuple(args.distraction_duration),
+                              crossover_rate=args.mutation_rates[0], crossover_identical_rate=args.mutation_rates[1],
+                              random_crossover_rate=args.mutation_rates[2],
+                              random_crossover_identical_rate=args.mutation_rates[3])
+        islands.run()
+        print(islands.report())
+        return 0
 
-    # Initialize Environment and Machine instances
-    environment = Environment(def_environment_size, start_location_xy, treasure_locations_xy)  # Create the environment with size, start, and treasure locations
-    virtual_machine = Machine()  # Create a virtual machine instance to process agent instructions
+    sinks = []
+    if not args.quiet:
+        sinks.append(print_progress)
+    if args.telemetry:
+        sinks.append(JsonLinesSink(args.telemetry))
+    if args.plot or args.plot_file:
+        from classes.plotting import FitnessPlotSink  # matplotlib is only loaded when a plot is requested
+        sinks.append(FitnessPlotSink(show=args.plot, output_path=args.plot_file))
 
-    # Create a Population instance and add Agents with randomly generated instruction sets
-    population = Population()
-    for _ in range(init_num_agents):
-        # Add agents with random instruction sets (instructions are integers between 0 and 255)
-        population.add_agent(Agent([random.randint(0, 255) for _ in range(init_num_instructions)]))
+    instrumentation = None
+    if args.instrument or args.profile:
+        from classes.instrumentation import Instrumentation
+        instrumentation = Instrumentation(profile_generations=args.profile, profile_path=args.profile_file)
+        args.workers = 1  # The machine and fitness phases are only measured (and profiled) in this process
 
-    # Simulation control variables
-    solution_found = False  # Flag to indicate if the solution (path to all treasures) was found
-    generations = 2000  # Number of generations to run the simulation
-    frequency = 200  # Frequency for applying special events like distraction
+    policy = None  # The default fixed cadence uses --first-distraction / --distraction-frequency / --distraction-duration
+    if args.scheduler == 'adaptive':
+        from classes.scheduler import AdaptivePolicy
+        policy = AdaptivePolicy()
 
-    # Main evolutionary loop (over generations)
-    for i in range(generations):
-        # Iterate through each agent in the current generation
-        for agent in population.generation:
-            virtual_machine.fill_memory(agent.inst_set)  # Load agent's instruction set into the machine's memory
-            
-            try:
-                # Evaluate the agent's commands in the environment
-                if environment.evaluate_commands(virtual_machine, agent):
-                    # If a valid solution (path) is found, output the agent's command set
-                    print("Path Found:", agent.cmd_set)
-                    solution_found = True  # Set the solution flag
-                    break  # Exit the loop since the solution is found
-            except OutOfBound:
-                # Handle case where agent moves out of bounds, assigning negative fitness
-                agent.fit_index = (agent.treasures_found + 0.1 - (agent.steps / 100)) * -1
-
-            # Clear the machine memory and reset environment for the next agent
-            virtual_machine.clear_memory()
-            environment.clear_environment(start_location_xy, treasure_locations_xy)
-
-        # Sort agents based on their fitness in descending order
-        sorted_agents = sorted(population.generation, key=lambda obj: obj.fit_index, reverse=True)
-        best_fitness = sorted_agents[0].fit_index  # Best fitness value in the current generation
-        population.fitness_history.append(best_fitness)  # Append best fitness to the history for plotting
-        population.first_i = best_fitness  # Store the best fitness value for this generation
-        
-        # Check if a valid path was found, and if so, print results and exit the loop
-        if solution_found:
-            break
-
-        print(i)  # Print current generation number for tracking progress
-
-        # Apply random distraction every 'frequency' generations
-        if i % frequency == 0 and i != 0:
-            # Annotate plot with distraction and create a new generation with forced changes
-            plt.annotate('distraction', xy=(i, best_fitness), xytext=(i+5, best_fitness+1), arrowprops=dict(facecolor='red', shrink=0.05))
-            population.create_new_generation(True)  # Create new generation with a distraction applied
-            frequency = 500  # Increase the frequency interval after the first distraction
-            distractor = random.randint(20, 40)  # Randomly set the number of generations to apply distractions
-            print("CC:", distractor)
-        else:
-            # If a distraction is active, apply it, else continue with standard generation
-            if distractor > 0:
-                population.create_new_generation(True)  # Create a new generation with forced changes
-                distractor -= 1  # Decrement the distraction counter
-            else:
-                population.create_new_generation(False)  # Create a normal new generation
-
-    print("Treasures:",sorted_agents[0].treasures_found)
-    print("Steps:", len(sorted_agents[0].cmd_set))  # Output the number of steps in the solution
-    print("Generations: ", i)  # Output the generation at which the solution was found
-    # Plot the evolution of fitness over generations
-    plt.plot(population.fitness_history, marker='o', linestyle='-', color='b')
-    plt.title('Fitness Function Evolution Over Generations')
-    plt.xlabel('Generation')
-    plt.ylabel('Best Fitness')
-    plt.grid(True)
-    plt.show()
+    evolution = Evolution(game_map, num_agents=args.agents, num_instructions=args.instructions,
+                          generations=args.generations, first_distraction=args.first_distraction,
+                          distraction_frequency=args.distraction_frequency,
+                          distraction_duration=tuple(args.distraction_duration), seed=args.seed,
+                          workers=args.workers or 1, backend=args.backend,
+                          cache_capacity=args.cache_capacity, trajectory_nodes=args.trajectory_cache,
+                          batch_size=args.batch_size, sinks=sinks,
+                          instrumentation=instrumentation, checkpoint_dir=args.checkpoint_dir,
+                          checkpoint_every=args.checkpoint_every if args.checkpoint_dir else 0,
+                          crossover_rate=args.mutation_rates[0], crossover_identical_rate=args.mutation_rates[1],
+                          random_crossover_rate=args.mutation_rates[2],
+                          random_crossover_identical_rate=args.mutation_rates[3], policy=policy,
+                          population=args.population)
+    result = evolution.run(args.resume)
+    if args.instrument:
+        instrumentation.export(args.instrument)
 
+    if result.solved:
+        print("Path Found:", result.cmd_set)  # Output the command set of the agent that found all treasures
+    print("Treasures:", result.treasures_found)
+    print("Steps:", len(result.cmd_set))  # Output the number of steps in the solution
+    print("Generations: ", result.generation)  # Output the generation at which the solution was found
+    stats = evolution.evaluator.machine_stats()  # Summed over the worker processes
+    print("Endless loops stopped:", stats['cycles_detected'], "instructions saved:", stats['steps_saved'])
     print("End of simulation.")  # Print message indicating the end of the simulation
+    return 0
 
-except FileNotFoundError:
-    # Handle the case where the input file is not found
-    print(f"File {file_path} not found.")
+# The guard keeps worker processes (which re-import this module) from running the simulation
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import glob
+import os
+import tempfile
+import unittest
+from classes.checkpoint import load_checkpoint, save_checkpoint
+from classes.evolution import Evolution
+from classes.map_loader import load_map
+from classes.scheduler import AdaptivePolicy
+
+try:
+    import numpy  # The array population is optional, it needs NumPy
+except ImportError:
+    numpy = None
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "input.txt")
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.game_map = load_map(MAP_PATH)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def assert_exact_resume(self, make_policy=lambda: None, **options):
+        # A run continued from any of its checkpoints ends exactly like the uninterrupted run
+        # (short distractions keep the runs fast, distraction generations reproduce slowly)
+        # Every run gets a new policy from make_policy, policies keep state
+        options = dict(generations=120, first_distraction=30, distraction_frequency=40, distraction_duration=(3, 6),
+                       **options)
+        reference = Evolution(self.game_map, policy=make_policy(), **options).run()
+        checkpointed = Evolution(self.game_map, policy=make_policy(), checkpoint_dir=self.directory.name,
+                                 checkpoint_every=25, **options)
+        self.assertEqual(checkpointed.run(), reference)
+        paths = sorted(glob.glob(os.path.join(self.directory.name, '*.tsc')))
+        self.assertGreater(len(paths), 1)
+        for path in paths:
+            self.assertEqual(Evolution(self.game_map, policy=make_policy(), **options).run(path), reference, path)
+
+    def test_resume_fixed_schedule(self):
+        self.assert_exact_resume(seed=4)
+
+    def test_resume_adaptive_schedule(self):
+        self.assert_exact_resume(seed=7, make_policy=lambda: AdaptivePolicy(patience=10, distraction_duration=(3, 6)))
+
+    @unittest.skipIf(numpy is None, "ArrayPopulation needs NumPy")
+    def test_resume_array_population(self):
+        self.assert_exact_resume(seed=4, population='array')
+
+    def test_round_trip(self):
+        evolution = Evolution(self.game_map, generations=10, seed=1)
+        evolution.run()
+        path = os.path.join(self.directory.name, 'state.tsc')
+        state = evolution.snapshot()
+        save_checkpoint(path, state)
+        loaded = load_checkpoint(path)
+        self.assertEqual(loaded['genomes'], state['genomes'])
+        self.assertEqual([loaded[key] for key in ('generation', 'num_agents', 'genome_length', 'fitness', 'steps', 'treasures')],
+                         [state[key] for key in ('generation', 'num_agents', 'genome_length', 'fitness', 'steps', 'treasures')])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import random
+import unittest
+from classes.evaluator import evaluate_inst_sets, make_environment
+from classes.evolution import Evolution
+from classes.machine import Machine
+from classes.map_loader import MapSpec, load_map
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "input.txt")
+
+# Grid environment, sparse environment and sparse environment scoring through the trajectory trie
+ENVIRONMENTS = {
+    'grid': {'sparse': False},
+    'sparse': {'sparse': True},
+    'trie': {'sparse': True, 'trajectory_nodes': 50000},
+}
+
+def make_genomes(count, length, seed):
+    rng = random.Random(seed)
+    return [[rng.randint(0, 255) for _ in range(length)] for _ in range(count)]
+
+class EnvironmentTest(unittest.TestCase):
+    def evaluate(self, game_map, genomes, **options):
+        environment = make_environment(*game_map, **options)
+        return evaluate_inst_sets(Machine(backend='bytes'), environment, game_map.start_location,
+                                  game_map.treasure_locations, genomes, stop_at_solution=False)
+
+    def test_results_identical(self):
+        # A small map with a treasure next to the start is solved by some random genomes
+        maps = [load_map(MAP_PATH), MapSpec(3, [1, 1], [[1, 2], [2, 1]])]
+        genomes = make_genomes(2000, 30, 5)
+        for game_map in maps:
+            results = {name: self.evaluate(game_map, genomes, **options) for name, options in ENVIRONMENTS.items()}
+            self.assertEqual(results['sparse'], results['grid'])
+            self.assertEqual(results['trie'], results['grid'])
+        self.assertTrue(any(result[4] for result in results['grid']))  # Some genome found all treasures
+
+    def test_evolution_identical(self):
+        game_map = load_map(MAP_PATH)
+        runs = {name: Evolution(game_map, generations=60, seed=7, **options).run() for name, options in ENVIRONMENTS.items()}
+        for name in ('sparse', 'trie'):
+            self.assertEqual(runs[name], runs['grid'], name)
+
+if __name__ == "__main__":
+    unittest.main()
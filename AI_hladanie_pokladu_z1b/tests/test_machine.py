@@ -0,0 +1,79 @@
+import random
+import unittest
+from classes.evaluator import run_program  # (trajectory, instructions) of one machine run
+from classes.machine import Machine, MaxInstructionsReached
+
+try:
+    import numpy  # BatchMachine is optional, it needs NumPy
+except ImportError:
+    numpy = None
+
+def make_genomes(count, length, seed):
+    rng = random.Random(seed)
+    return [[rng.randint(0, 255) for _ in range(length)] for _ in range(count)]
+
+# Hand-written programs (opcode in the first 2 bits, address in the last 6): a plain run of outputs,
+# a jump to itself, a loop incrementing a cell it never executes, a loop rewriting its own jump
+PROGRAMS = [
+    [0b11000000, 0b11000111, 0b11111111],
+    [0b10000000],
+    [0b00111111, 0b10000000],
+    [0b11000011, 0b00000010, 0b10000000],
+]
+
+def outcome(machine, inst_set):
+    # Everything a caller can observe after one execution
+    cycles, saved = machine.cycles_detected, machine.steps_saved
+    machine.fill_memory(inst_set)
+    try:
+        result = ('trajectory', machine.execute_commands())
+    except MaxInstructionsReached as error:
+        result = ('max_instructions', error.steps_saved)
+    machine.clear_memory()
+    return result, machine.instructions, machine.cycles_detected - cycles, machine.steps_saved - saved
+
+class BackendTest(unittest.TestCase):
+    def setUp(self):
+        self.genomes = PROGRAMS + make_genomes(1500, 30, 1) + make_genomes(500, 64, 2)
+
+    def test_bytes_matches_string(self):
+        for detect_cycles in (True, False):
+            string = Machine(backend='string', detect_cycles=detect_cycles)
+            fast = Machine(backend='bytes', detect_cycles=detect_cycles)
+            for inst_set in self.genomes:
+                self.assertEqual(outcome(fast, inst_set), outcome(string, inst_set), inst_set)
+            self.assertEqual(fast.cycles_detected, string.cycles_detected)
+            self.assertEqual(fast.steps_saved, string.steps_saved)
+
+    def test_cycle_detection_only_stops_endless_programs(self):
+        # Stopping a loop early never changes the trajectory, only the instruction count
+        detecting = Machine(backend='bytes')
+        plain = Machine(backend='bytes', detect_cycles=False)
+        for inst_set in self.genomes:
+            (kind, value), instructions, cycles, saved = outcome(detecting, inst_set)
+            (plain_kind, plain_value), plain_instructions, _, _ = outcome(plain, inst_set)
+            self.assertEqual(kind, plain_kind)
+            if cycles:
+                self.assertEqual(value, saved)
+                self.assertEqual(instructions + saved, Machine.MAX_INSTRUCTIONS)
+            else:
+                self.assertEqual((value, instructions), (plain_value, plain_instructions))
+        self.assertGreater(detecting.cycles_detected, 0)
+
+    def test_instruction_limit(self):
+        machine = Machine(backend='bytes', detect_cycles=False)
+        machine.fill_memory(PROGRAMS[1])
+        with self.assertRaises(MaxInstructionsReached):
+            machine.execute_commands()
+        self.assertEqual(machine.instructions, Machine.MAX_INSTRUCTIONS)
+
+    @unittest.skipIf(numpy is None, "BatchMachine needs NumPy")
+    def test_batch_matches_machine_without_cycle_detection(self):
+        from classes.batch_machine import BatchMachine
+        machine = Machine(backend='bytes', detect_cycles=False)
+        mixed = self.genomes + make_genomes(200, 70, 3)  # Genomes of different lengths are filled row by row
+        for genomes in (self.genomes[len(PROGRAMS):], mixed):
+            self.assertEqual(BatchMachine().run_programs(genomes), [run_program(machine, inst_set) for inst_set in genomes])
+
+if __name__ == "__main__":
+    unittest.main()